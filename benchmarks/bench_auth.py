@@ -0,0 +1,95 @@
+"""Requests per second for /news/headlines/* behind the previous BaseHTTPMiddleware
+based authentication middleware and the plain ASGI one.
+
+Run from the project root: ``python -m benchmarks.bench_auth``
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import jwt
+from fastapi import FastAPI, Request, HTTPException
+from jwt.exceptions import InvalidTokenError
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from benchmarks.common import measure_async, report
+from conf.middlewares import AuthenticationMiddleware
+from conf.vars import JWT_SECRET, CLIENT_ID
+from routers import news_router
+from utils.news_api_client import news_api_client
+from utils.token import generate_access_token
+
+
+class BaseHTTPAuthenticationMiddleware(BaseHTTPMiddleware):
+    """The authentication middleware as it was before the plain ASGI rewrite."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'http':
+            request = Request(scope, receive, send)
+            try:
+                await super().__call__(scope, receive, send)
+            except RuntimeError as e:
+                if not await request.is_disconnected():
+                    raise e
+        else:
+            await super().__call__(scope, receive, send)
+
+    async def dispatch(self, request: Request, call_next):
+        authorization = request.headers.get('authorization')
+        request.state.is_authenticated = False
+        if authorization:
+            token = authorization.split(" ")[-1]
+            try:
+                payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+                client_id = payload.get('sub')
+                if not client_id or client_id != CLIENT_ID:
+                    raise HTTPException(status_code=401, detail="Invalid Token")
+                request.state.is_authenticated = True
+            except InvalidTokenError:
+                pass
+        return await call_next(request)
+
+
+ARTICLES = [
+    {
+        "source": {"id": "bbc-news", "name": "BBC News"},
+        "author": "Jane Doe",
+        "title": f"Headline {index}",
+        "description": "A short description of the article.",
+        "url": f"https://example.com/{index}",
+        "publishedAt": "2025-04-18T12:00:00Z",
+    }
+    for index in range(20)
+]
+
+
+def _app(middleware_class) -> FastAPI:
+    app = FastAPI(middleware=[Middleware(middleware_class)])
+    app.include_router(news_router)
+    return app
+
+
+async def _requests_per_second(app: FastAPI, path: str, number: int) -> float:
+    headers = {"Authorization": f"Bearer {generate_access_token()}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def request():
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+
+        return await measure_async(request, number=number)
+
+
+async def main(number: int = 500):
+    with patch.object(news_api_client, "get_headlines_by_country", AsyncMock(return_value=ARTICLES)), \
+            patch.object(news_api_client, "get_headlines_by_source", AsyncMock(return_value=ARTICLES)):
+        for path in ("/news/headlines/country/us", "/news/headlines/source/bbc-news"):
+            before = await _requests_per_second(_app(BaseHTTPAuthenticationMiddleware), path, number)
+            after = await _requests_per_second(_app(AuthenticationMiddleware), path, number)
+            report(path, before, after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""Cost per Log call of the inspect.stack() caller lookup against the frame walk.
+
+Run from the project root: ``python -m benchmarks.bench_log``
+"""
+import inspect
+import logging
+from unittest.mock import patch
+
+from benchmarks.common import measure, report
+from utils import log
+from utils.log import Log
+
+
+def _log_with_inspect_stack(message: str, data: dict = None):
+    """Log.warning as it was: the caller is looked up with inspect.stack()."""
+    _inspect = inspect.stack()
+    method_info = {'file_path': _inspect[1].filename, 'method': _inspect[1].function}
+    log.LOGGER.warning(message, extra={'data': data, 'method_info': method_info})
+
+
+def _nested(call, depth: int):
+    """Call ``call`` ``depth`` frames deep, like a log call inside a request."""
+    if depth == 0:
+        return call()
+    return _nested(call, depth - 1)
+
+
+def main(depth: int = 30):
+    logger = logging.getLogger("bench_log")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    with patch.object(log, "LOGGER", logger):
+        before = measure(lambda: _nested(lambda: _log_with_inspect_stack("Invalid Token"), depth))
+        after = measure(lambda: _nested(lambda: Log.warning("Invalid Token"), depth))
+        report(f"warning, {depth} frames deep", before, after)
+        with patch.object(log, "LOG_CALLER_INFO", False):
+            disabled = measure(lambda: _nested(lambda: Log.warning("Invalid Token"), depth))
+        report("warning, caller info disabled", before, disabled)
+        print(f"per call: {1e6 / before:.1f} us -> {1e6 / after:.1f} us ({1e6 / disabled:.1f} us disabled)")
+
+
+if __name__ == "__main__":
+    main()
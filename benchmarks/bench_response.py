@@ -0,0 +1,73 @@
+"""Compare CustomJSONResponse rendering with the previous stdlib json render.
+
+Run from the project root: ``python -m benchmarks.bench_response``
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+
+from benchmarks.common import measure, report
+from conf.paginations import Pagination
+from conf.response import CustomJSONResponse
+
+
+class StdlibJSONResponse(JSONResponse):
+    """The envelope render as it was before switching to orjson."""
+
+    def __init__(self, content, message: str = None, status_code: int = 200, **kwargs):
+        self.message = message
+        super().__init__(content=content, status_code=status_code, **kwargs)
+
+    def render(self, content):
+        is_success = 200 <= self.status_code < 300
+        custom_content = {
+            "success": is_success,
+            "message": self.message
+            or (is_success and "Request Success")
+            or "Request Failed",
+        }
+        if isinstance(content, dict) and "data" in content.keys():
+            custom_content.update(**content)
+        else:
+            custom_content["data"] = content
+        if isinstance(custom_content.get("data"), dict) \
+            and custom_content.get("data", {}).get("message"):
+            custom_content["message"] = custom_content["data"]["message"]
+        return super().render(custom_content)
+
+
+def _articles(count: int) -> list:
+    """Article rows with their datetimes already serialized, a payload both renders accept."""
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": index,
+            "identity": f"{index:064x}",
+            "title": f"Article {index} about something newsworthy",
+            "author": "Jane Doe",
+            "description": "A short description of the article. " * 4,
+            "published_at": (now - timedelta(minutes=index)).isoformat(),
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    for count in (10, 100):
+        articles = _articles(count)
+
+        def stdlib_render():
+            page = Pagination(page=1, limit=count, total_count=1000, data=articles)
+            return StdlibJSONResponse(content=page.get_paginated_data())
+
+        def fast_render():
+            page = Pagination(page=1, limit=count, total_count=1000, data=articles)
+            return CustomJSONResponse(content=page.get_paginated_data())
+
+        report(f"paginated {count} articles", measure(stdlib_render), measure(fast_render))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import time
+from typing import Awaitable, Callable
+
+
+__all__ = ['measure', 'measure_async', 'report']
+
+
+def measure(func: Callable[[], object], number: int = 1000, repeat: int = 5) -> float:
+    """Best throughput of ``func`` in calls per second over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+async def measure_async(func: Callable[[], Awaitable[object]], number: int = 1000,
+                        repeat: int = 5) -> float:
+    """Best throughput of awaiting ``func()`` in calls per second over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, time.perf_counter() - start)
+    return number / best
+
+
+def report(name: str, baseline: float, candidate: float) -> None:
+    """Print the throughput of a baseline and a candidate side by side."""
+    print(f"{name:<32} {baseline:>12,.0f} ops/s {candidate:>12,.0f} ops/s {candidate / baseline:>6.2f}x")
@@ -0,0 +1,103 @@
+"""Local stand-in for NewsAPI with configurable latency, jitter, error rate and payload size.
+
+Run from the project root: ``python -m benchmarks.fake_newsapi --port 8100 --latency 50``
+and point the API at it with ``NEWS_API_BASE_URL=http://127.0.0.1:8100/v2``.
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+SOURCES = [("bbc-news", "BBC News"), ("cnn", "CNN"), ("reuters", "Reuters"), (None, "Local Paper")]
+TOTAL_RESULTS = 1000
+
+
+def _articles(seed: str, count: int, description_size: int) -> list:
+    """Deterministic articles for a request, so repeated requests return the same payload."""
+    published_at = datetime(2025, 4, 18, 12, tzinfo=timezone.utc)
+    articles = []
+    for index in range(count):
+        source_id, source_name = SOURCES[index % len(SOURCES)]
+        articles.append({
+            "source": {"id": source_id, "name": source_name},
+            "author": f"Author {index % 7}",
+            "title": f"{seed} headline {index}",
+            "description": ("Lorem ipsum dolor sit amet. " * (description_size // 28 + 1))[:description_size],
+            "url": f"https://news.example/{seed}/{index}",
+            "urlToImage": f"https://news.example/{seed}/{index}.jpg",
+            "publishedAt": (published_at - timedelta(minutes=index)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "content": None,
+        })
+    return articles
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+               articles: int = 100, description_size: int = 200) -> Starlette:
+    """Fake NewsAPI answering ``/v2/everything`` and ``/v2/top-headlines``.
+
+    ``latency`` and ``jitter`` are in seconds; ``articles`` caps the page size.
+    """
+
+    async def respond(request: Request, seed: str, total: int):
+        delay = latency + random.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < error_rate:
+            return JSONResponse(
+                {"status": "error", "code": "unexpectedError", "message": "Injected failure"},
+                status_code=500,
+            )
+        page_size = min(int(request.query_params.get("pageSize", 100)), articles)
+        page = int(request.query_params.get("page", 1))
+        return JSONResponse({
+            "status": "ok",
+            "totalResults": total,
+            "articles": _articles(f"{seed}-{page}", page_size, description_size),
+        })
+
+    async def everything(request: Request):
+        return await respond(request, request.query_params.get("q", "news"), TOTAL_RESULTS)
+
+    async def top_headlines(request: Request):
+        seed = request.query_params.get("sources") or request.query_params.get("country") or "top"
+        return await respond(request, seed, articles)
+
+    async def health(_request: Request):
+        return JSONResponse({"status": "ok"})
+
+    return Starlette(routes=[
+        Route("/v2/everything", everything),
+        Route("/v2/top-headlines", top_headlines),
+        Route("/health", health),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="base latency in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency jitter in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--articles", type=int, default=100, help="articles per response")
+    parser.add_argument("--description-size", type=int, default=200, help="characters per description")
+    args = parser.parse_args()
+    app = create_app(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        articles=args.articles,
+        description_size=args.description_size,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
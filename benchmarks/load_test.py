@@ -0,0 +1,304 @@
+"""Load test every /news and auth route against a local fake NewsAPI.
+
+The fake NewsAPI (``benchmarks.fake_newsapi``) and the API itself (uvicorn,
+SQLite database in a temporary directory) are started as subprocesses. Each
+route is then driven in turn with ``--requests`` requests at ``--concurrency``
+and reported as requests per second and p50/p95/p99 latency.
+
+Run from the project root::
+
+    python -m benchmarks.load_test --concurrency 16 --requests 300 --output results.json
+    python -m benchmarks.load_test --output new.json --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+
+CLIENT_ID = os.getenv("CLIENT_ID", "demo-client")
+CLIENT_SECRET = os.getenv("CLIENT_SECRET", "C51D80D50A15DF7D")
+
+
+@dataclass
+class Scenario:
+    """One route under load.
+
+    ``params`` builds the query parameters of a request; ``prepare`` runs
+    before it, untimed, and returns extra parameters.
+    """
+    name: str
+    method: str
+    path: Callable[[dict], str]
+    params: Callable[[dict], dict] = lambda ctx: {}
+    prepare: Optional[Callable[[httpx.AsyncClient, dict], Awaitable[dict]]] = None
+    authenticated: bool = True
+
+
+@dataclass
+class RouteResult:
+    requests: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
+
+
+def percentile(sorted_latencies: List[float], rank: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted latencies in seconds, in milliseconds."""
+    if not sorted_latencies:
+        return None
+    index = max(math.ceil(rank / 100 * len(sorted_latencies)) - 1, 0)
+    return round(sorted_latencies[index] * 1000, 2)
+
+
+async def _new_code(client: httpx.AsyncClient, _ctx: dict) -> dict:
+    response = await client.get("/code", params={"client_id": CLIENT_ID})
+    return {"code": response.json()["data"]["code"]}
+
+
+SCENARIOS = [
+    Scenario("GET /code", "GET", lambda ctx: "/code",
+             lambda ctx: {"client_id": CLIENT_ID}, authenticated=False),
+    Scenario("GET /token", "GET", lambda ctx: "/token",
+             lambda ctx: {"client_id": CLIENT_ID, "client_secret": CLIENT_SECRET},
+             prepare=_new_code, authenticated=False),
+    Scenario("GET /news", "GET", lambda ctx: "/news",
+             lambda ctx: {"search": random.choice(ctx["searches"]), "page": 1, "limit": 10}),
+    Scenario("GET /news (limit 300)", "GET", lambda ctx: "/news",
+             lambda ctx: {"search": random.choice(ctx["searches"]), "page": 1, "limit": 300}),
+    Scenario("GET /news/export", "GET", lambda ctx: "/news/export",
+             lambda ctx: {"search": random.choice(ctx["searches"]), "max_pages": 2}),
+    Scenario("POST /news/save-latest", "POST", lambda ctx: "/news/save-latest"),
+    Scenario("GET /news/saved", "GET", lambda ctx: "/news/saved", lambda ctx: {"limit": 10}),
+    Scenario("GET /news/saved/search", "GET", lambda ctx: "/news/saved/search",
+             lambda ctx: {"search": "headline", "limit": 10}),
+    Scenario("GET /news/saved/{article_id}", "GET",
+             lambda ctx: f"/news/saved/{ctx['article_id']}"),
+    Scenario("GET /news/headlines/country/{country_code}", "GET",
+             lambda ctx: "/news/headlines/country/us"),
+    Scenario("GET /news/headlines/source/{source_id}", "GET",
+             lambda ctx: "/news/headlines/source/bbc-news"),
+    Scenario("GET /news/headlines/filter", "GET", lambda ctx: "/news/headlines/filter",
+             lambda ctx: {"country": "us", "source": "bbc-news"}),
+]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: dict,
+                       requests: int, concurrency: int) -> RouteResult:
+    """Send ``requests`` requests for ``scenario`` from ``concurrency`` workers."""
+    result = RouteResult()
+    headers = {"Authorization": f"Bearer {ctx['token']}"} if scenario.authenticated else {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            params = scenario.params(ctx)
+            if scenario.prepare is not None:
+                params.update(await scenario.prepare(client, ctx))
+            started_at = time.perf_counter()
+            try:
+                response = await client.request(
+                    scenario.method, scenario.path(ctx), params=params, headers=headers
+                )
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            result.latencies.append(time.perf_counter() - started_at)
+            result.requests += 1
+            result.errors += failed
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started_at
+    return result
+
+
+async def _setup(client: httpx.AsyncClient, search_pool: int) -> dict:
+    """Token, search terms and a stored article id for the scenarios."""
+    code = (await _new_code(client, {}))["code"]
+    response = await client.get(
+        "/token", params={"client_id": CLIENT_ID, "client_secret": CLIENT_SECRET, "code": code}
+    )
+    token = response.json()["data"]["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    await client.post("/news/save-latest", headers=headers)
+    saved = (await client.get("/news/saved", params={"limit": 1}, headers=headers)).json()
+    article_id = saved["data"][0]["id"] if saved.get("data") else 1
+    return {
+        "token": token,
+        "searches": [f"topic{index}" for index in range(search_pool)],
+        "article_id": article_id,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+def _start_servers(args, workdir: str) -> Dict[str, object]:
+    fake_port, app_port = _free_port(), _free_port()
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_newsapi", "--port", str(fake_port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--articles", str(args.articles),
+        "--description-size", str(args.description_size),
+    ])
+    env = {
+        **os.environ,
+        "NEWS_API_BASE_URL": f"http://127.0.0.1:{fake_port}/v2",
+        "NEWS_API_KEY": os.getenv("NEWS_API_KEY", "load-test"),
+        "DB_ENGINE": "sqlite",
+        "DB_NAME": os.path.join(workdir, "load_test.sqlite3"),
+        # Codes issued by one worker have to be found by the others
+        "AUTH_CODE_BACKEND": "sqlite" if args.workers > 1 else "memory",
+        "AUTH_CODE_SQLITE_PATH": os.path.join(workdir, "auth_codes.sqlite3"),
+        "CLIENT_ID": CLIENT_ID,
+        "CLIENT_SECRET": CLIENT_SECRET,
+        "JWT_SECRET": os.getenv("JWT_SECRET", "load-test-secret"),
+        # Let the fake upstream take the whole load instead of the plan's quota
+        "NEWS_API_RATE": "1000000",
+        "NEWS_API_BURST": "1000000",
+    }
+    app = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ], env=env)
+    return {
+        "processes": [fake, app],
+        "fake_url": f"http://127.0.0.1:{fake_port}",
+        "app_url": f"http://127.0.0.1:{app_port}",
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print the change of every route against ``baseline``; return the regressed routes."""
+    regressions = []
+    for name, route in results["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before or not before["rps"] or not before["p95_ms"] or route["p95_ms"] is None:
+            continue
+        rps_change = route["rps"] / before["rps"] - 1
+        p95_change = route["p95_ms"] / before["p95_ms"] - 1
+        regressed = rps_change < -threshold or p95_change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<45} rps {rps_change:+7.1%}  p95 {p95_change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+async def main_async(args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        servers = _start_servers(args, workdir)
+        try:
+            await _wait_until_up(f"{servers['fake_url']}/health")
+            await _wait_until_up(f"{servers['app_url']}/metrics")
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(
+                base_url=servers["app_url"], limits=limits, timeout=60
+            ) as client:
+                ctx = await _setup(client, args.search_pool)
+                routes = {}
+                for scenario in SCENARIOS:
+                    result = await run_scenario(
+                        client, scenario, ctx, args.requests, args.concurrency
+                    )
+                    routes[scenario.name] = result.to_json()
+                    row = routes[scenario.name]
+                    print(f"{scenario.name:<45} {row['rps']:>9.1f} rps  p50 {row['p50_ms']:>8.2f} ms"
+                          f"  p95 {row['p95_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms"
+                          f"  errors {row['errors']}")
+        finally:
+            for process in servers["processes"]:
+                process.terminate()
+                process.wait(timeout=10)
+    return {
+        "revision": _git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "routes": routes,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=300, help="requests per route")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--search-pool", type=int, default=20,
+                        help="distinct search terms, fewer means more cache hits")
+    parser.add_argument("--latency", type=float, default=50, help="fake NewsAPI latency in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="fake NewsAPI jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake NewsAPI error rate")
+    parser.add_argument("--articles", type=int, default=100, help="articles per upstream page")
+    parser.add_argument("--description-size", type=int, default=200)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative rps drop or p95 rise counted as a regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
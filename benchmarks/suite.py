@@ -0,0 +1,265 @@
+"""Microbenchmarks of the helpers that run on every request or every row.
+
+Every case reports calls per second (best of ``--repeat`` runs) and, from
+tracemalloc, the peak memory allocated during one call and the memory still
+held per call afterwards. Run from the project root::
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --output head.json
+    python -m benchmarks.suite --compare baseline HEAD
+
+``--compare`` checks both revisions out with ``git worktree`` and runs this
+file against each of them. The cases therefore only use interfaces that older
+revisions have too and import nothing else from ``benchmarks``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+
+os.environ.setdefault("CLIENT_ID", "demo-client")
+os.environ.setdefault("JWT_SECRET", "microbenchmark-secret")
+os.environ.setdefault("NEWS_API_KEY", "microbenchmark")
+
+ARTICLES = 100
+
+
+class Case:
+    """A named callable; ``is_async`` cases are awaited on an event loop."""
+
+    def __init__(self, name: str, func: Callable, is_async: bool = False):
+        self.name = name
+        self.func = func
+        self.is_async = is_async
+
+
+def newsapi_articles(count: int = ARTICLES) -> List[dict]:
+    """Articles shaped like the ``articles`` of a NewsAPI ``/everything`` response."""
+    published_at = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+    return [
+        {
+            "source": {"id": "bbc-news", "name": "BBC News"},
+            "author": "Jane Doe",
+            "title": f"Article {index} about something newsworthy",
+            "description": "A short description of the article. " * 4,
+            "url": f"https://www.bbc.co.uk/news/articles/{index:08d}",
+            "urlToImage": f"https://ichef.bbci.co.uk/news/{index:08d}.jpg",
+            "publishedAt": (published_at - timedelta(minutes=index)).isoformat().replace("+00:00", "Z"),
+            "content": "The first characters of the article body. " * 5 + "[+2048 chars]",
+        }
+        for index in range(count)
+    ]
+
+
+def build_cases() -> List[Case]:
+    """Cases over the modules of the checkout on ``sys.path``."""
+    from conf.middlewares import AuthenticationMiddleware
+    from conf.paginations import Pagination
+    from conf.response import CustomJSONResponse
+    from models import Article
+    from utils import log
+    from utils.log import Log
+    from utils.token import generate_access_token
+
+    # Measure the cost of emitting a record, not the console or the log file
+    null_logger = logging.getLogger("microbenchmark")
+    null_logger.addHandler(logging.NullHandler())
+    null_logger.propagate = False
+    log.LOGGER = null_logger
+
+    articles = newsapi_articles()
+    now = datetime.now(timezone.utc)
+    rows = [
+        Article(id=index, title=article["title"], author=article["author"],
+                description=article["description"], published_at=now - timedelta(minutes=index),
+                created_at=now, updated_at=now)
+        for index, article in enumerate(articles)
+    ]
+
+    async def downstream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    middleware = AuthenticationMiddleware(downstream)
+
+    def scope(authorization: bytes) -> dict:
+        return {
+            "type": "http", "method": "GET", "path": "/news", "raw_path": b"/news",
+            "query_string": b"", "root_path": "", "scheme": "http", "http_version": "1.1",
+            "headers": [(b"host", b"testserver"), (b"authorization", authorization)],
+            "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+        }
+
+    valid_scope = scope(b"Bearer " + str(generate_access_token()).encode())
+    invalid_scope = scope(b"Bearer not-a-token")
+
+    return [
+        Case(f"CustomJSONResponse.render {ARTICLES} articles", lambda: CustomJSONResponse(
+            content=Pagination(page=1, limit=ARTICLES, total_count=1000, data=articles)
+            .get_paginated_data()
+        )),
+        Case(f"Pagination.get_paginated_data {ARTICLES} articles", lambda: Pagination(
+            page=1, limit=ARTICLES, total_count=1000, data=articles
+        ).get_paginated_data()),
+        # _send_log changed its signature over time, Log.warning is the stable entry point
+        Case("Log._send_log via Log.warning", lambda: Log.warning(
+            message="Invalid Token | Path: /news", data={"error": "Signature has expired"}
+        )),
+        Case("AuthenticationMiddleware valid token",
+             lambda: middleware(dict(valid_scope), receive, send), is_async=True),
+        Case("AuthenticationMiddleware invalid token",
+             lambda: middleware(dict(invalid_scope), receive, send), is_async=True),
+        Case("generate_access_token", generate_access_token),
+        Case(f"Article.to_json {ARTICLES} rows", lambda: [row.to_json() for row in rows]),
+    ]
+
+
+async def _throughput(case: Case, number: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if case.is_async:
+            started_at = time.perf_counter()
+            for _ in range(number):
+                await case.func()
+        else:
+            started_at = time.perf_counter()
+            for _ in range(number):
+                case.func()
+        best = min(best, time.perf_counter() - started_at)
+    return number / best
+
+
+async def _allocations(case: Case, number: int) -> Dict[str, float]:
+    """Mean peak bytes allocated during one call, and bytes still held per call."""
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peaks = 0
+        for _ in range(number):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            if case.is_async:
+                await case.func()
+            else:
+                case.func()
+            peaks += tracemalloc.get_traced_memory()[1] - before
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": round(peaks / number), "retained_bytes": round((end - start) / number, 1)}
+
+
+async def run_cases(cases: List[Case], number: int, repeat: int) -> Dict[str, dict]:
+    results = {}
+    for case in cases:
+        try:
+            # Warm up caches and lazy imports before timing
+            for _ in range(10):
+                await case.func() if case.is_async else case.func()
+            results[case.name] = {
+                "ops_per_sec": round(await _throughput(case, number, repeat), 1),
+                **await _allocations(case, min(number, 200)),
+            }
+        except Exception as error:  # a case that does not apply to this revision
+            results[case.name] = {"error": f"{type(error).__name__}: {error}"}
+    return results
+
+
+def _git(*args: str, cwd: str = None) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def run(args) -> dict:
+    results = asyncio.run(run_cases(build_cases(), args.number, args.repeat))
+    try:
+        revision = _git("rev-parse", "HEAD")
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "python": sys.version.split()[0],
+        "config": {"number": args.number, "repeat": args.repeat, "articles": ARTICLES},
+        "cases": results,
+    }
+
+
+def run_revision(revision: str, args) -> dict:
+    """Run this suite against a ``git worktree`` checkout of ``revision``."""
+    root = _git("rev-parse", "--show-toplevel")
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = os.path.join(workdir, "tree")
+        output = os.path.join(workdir, "results.json")
+        _git("worktree", "add", "--detach", tree, revision, cwd=root)
+        try:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--output", output,
+                 "--number", str(args.number), "--repeat", str(args.repeat)],
+                cwd=tree, env={**os.environ, "PYTHONPATH": tree}, check=True,
+            )
+            with open(output, encoding="utf-8") as results:
+                return json.load(results)
+        finally:
+            _git("worktree", "remove", "--force", tree, cwd=root)
+
+
+def _print_results(results: dict) -> None:
+    for name, case in results["cases"].items():
+        if "error" in case:
+            print(f"{name:<44} {case['error']}")
+            continue
+        print(f"{name:<44} {case['ops_per_sec']:>12,.0f} ops/s {case['peak_bytes']:>10,} B peak"
+              f" {case['retained_bytes']:>8,.1f} B held")
+
+
+def _print_comparison(base: dict, head: dict) -> None:
+    print(f"{'':<44} {base['revision'][:10]:>16} {head['revision'][:10]:>16}")
+    for name in dict.fromkeys([*base["cases"], *head["cases"]]):
+        before, after = base["cases"].get(name, {}), head["cases"].get(name, {})
+        if "ops_per_sec" not in before or "ops_per_sec" not in after:
+            print(f"{name:<44} {'n/a':>16} {'n/a':>16}")
+            continue
+        print(f"{name:<44} {before['ops_per_sec']:>12,.0f} ops/s {after['ops_per_sec']:>12,.0f} ops/s"
+              f" {after['ops_per_sec'] / before['ops_per_sec']:>6.2f}x"
+              f"  peak {before['peak_bytes']:>9,} B -> {after['peak_bytes']:>9,} B")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs, the best one counts")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"),
+                        help="run against two git revisions and compare them")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        base, head = (run_revision(revision, args) for revision in args.compare)
+        _print_comparison(base, head)
+        results = {"base": base, "head": head}
+    else:
+        results = run(args)
+        _print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,27 @@
-from .vars import DB_HOST, DB_PORT, DB_NAME, DB_USERNAME, DB_PASSWORD
+from .vars import DB_ENGINE, DB_HOST, DB_PORT, DB_NAME, DB_USERNAME, DB_PASSWORD
+
+
+if DB_ENGINE == "sqlite":
+    DEFAULT_CONNECTION = {
+        'engine': 'tortoise.backends.sqlite',
+        'credentials': {'file_path': DB_NAME or 'db.sqlite3'},
+    }
+else:
+    DEFAULT_CONNECTION = {
+        'engine': 'tortoise.backends.asyncpg',
+        'credentials': {
+            'host': DB_HOST,
+            'port': DB_PORT,
+            'user': DB_USERNAME,
+            'password': DB_PASSWORD,
+            'database': DB_NAME,
+        }
+    }
 
 
 TORTOISE_CONFIG = {
     "connections": {
-        'default': {
-            'engine': 'tortoise.backends.asyncpg',
-            'credentials': {
-                'host': DB_HOST,
-                'port': DB_PORT,
-                'user': DB_USERNAME,
-                'password': DB_PASSWORD,
-                'database': DB_NAME,
-            }
-        }
+        'default': DEFAULT_CONNECTION,
     },
     'apps': {
         'models': {
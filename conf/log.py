@@ -1,16 +1,60 @@
+import copy
+import queue
 from logging import Formatter, LogRecord
+from logging.handlers import QueueHandler
 from datetime import datetime
 
 
 class LocalFormatter(Formatter):
     """Custom formatter for logging locally."""
 
-    def format(self, record: LogRecord):
-        all_data = record.__dict__
-        data = all_data.get("data")
-        message = record.msg
-        record.msg = f"{record.levelname}: MSG:{message} - DATA:{data} - {datetime.now().isoformat()}"
-        return super().format(record)
+    def formatMessage(self, record: LogRecord):
+        data = record.__dict__.get("data")
+        created_at = datetime.fromtimestamp(record.created).isoformat()
+        return f"{record.levelname}: MSG:{record.message} - DATA:{data} - {created_at}"
+
+
+_exception_formatter = Formatter()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler for a bounded queue.
+
+    When the queue is full a record is either dropped and counted in
+    ``dropped`` (``overflow="drop"``) or the caller waits for room
+    (``overflow="block"``). Records are queued unformatted, the handlers
+    behind the queue format them on the listener thread.
+    """
+
+    OVERFLOW_POLICIES = ("drop", "block")
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop"):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown LOG_QUEUE_OVERFLOW: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        """Merge the arguments and the exception into the record, without formatting it."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold on to every frame, hand over their text instead
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "block":
+                self.queue.put(record)
+            else:
+                self.dropped += 1
 
 
 LOGGING_CONFIG = {
@@ -1,45 +1,398 @@
-import jwt
+import gzip
+import hmac
+import random
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
 from jwt.exceptions import InvalidTokenError
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
 
 from utils.log import Log
-from conf.vars import JWT_SECRET, CLIENT_ID
+from utils.metrics import registry, REQUEST_DURATION
+from utils.profiler import profile_store
+from utils.token import decode_access_token
+from conf.vars import (
+    CLIENT_ID,
+    COMPRESSION_MINIMUM_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_CACHE_MAXSIZE,
+    PROFILE_HEADER,
+    PROFILE_TOKEN,
+    PROFILE_SAMPLE_RATE,
+)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+class AuthenticationMiddleware:
+    """Middleware to handle OAuth2 authentication.
+
+    Plain ASGI middleware: it sets ``request.state.is_authenticated`` through
+    the scope and passes the original ``receive``/``send`` on untouched.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        authorization = Headers(scope=scope).get('authorization')
+        scope.setdefault('state', {})['is_authenticated'] = self.authenticate(
+            authorization, scope['path']
+        )
+        try:
+            await self.app(scope, receive, send)
+        except RuntimeError as e:
+            if not await Request(scope, receive).is_disconnected():
+                Log.error(message=f'API call has failed! Error Message: {e}')
+                raise e
+            Log.error(message=f'Client disconnected the API request! Error Message: {e}')
 
+    @staticmethod
+    def authenticate(authorization: Optional[str], path: str) -> bool:
+        """Whether the ``Authorization`` header carries a valid token of our client."""
+        if not authorization:
+            return False
+        token = authorization.split(" ")[-1]
+        try:
+            payload = decode_access_token(token)
+        except InvalidTokenError as error:
+            Log.warning(data={'error': f'{error}'},
+                        message=f'Invalid Token | Path: {path} ',
+                        dedup_key=(path, type(error).__name__))
+            return False
+        client_id = payload.get('sub')
+        if not client_id or client_id != CLIENT_ID:
+            Log.warning(message=f'Invalid Token Client | Path: {path} ',
+                        dedup_key=(path, 'InvalidClient'))
+            return False
+        return True
 
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    """Middleware to handle OAuth2 authentication."""
+
+# Headers a 304 response repeats from the 200 response it replaces
+NOT_MODIFIED_HEADERS = (b"etag", b"cache-control", b"vary", b"expires", b"content-location")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+class ConditionalGetMiddleware:
+    """Answer a GET whose ``If-None-Match`` matches the response ETag with 304 Not Modified.
+
+    The body of the matched response is dropped, so polling clients get an
+    empty 304 instead of the same bytes again.
+    """
     def __init__(self, app):
-        super().__init__(app)
-    
+        self.app = app
+
     async def __call__(self, scope, receive, send) -> None:
-        if scope['type'] == 'http':
-            request = Request(scope, receive, send)
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_conditional(message):
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                etag = Headers(raw=message["headers"]).get("etag")
+                if message["status"] == 200 and etag and _etag_matches(if_none_match, etag):
+                    not_modified = True
+                    await send({
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [
+                            (name, value) for name, value in message["headers"]
+                            if name in NOT_MODIFIED_HEADERS
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            elif not_modified:
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_conditional)
+
+
+# Content types worth compressing, matched by prefix
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml")
+
+
+class _GzipStream:
+    """Incremental gzip encoder that flushes every chunk, for streamed responses."""
+    def __init__(self, level: int):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def process(self, chunk: bytes) -> bytes:
+        return self._compressobj.compress(chunk) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class _BrotliStream:
+    """Incremental brotli encoder that flushes every chunk, for streamed responses."""
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _available_encoders() -> dict:
+    """Encoders by ``Content-Encoding`` name, most preferred first."""
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = (
+            lambda body: brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY),
+            lambda: _BrotliStream(COMPRESSION_BROTLI_QUALITY),
+        )
+    encoders["gzip"] = (
+        lambda body: gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0),
+        lambda: _GzipStream(COMPRESSION_GZIP_LEVEL),
+    )
+    return encoders
+
+
+def _negotiate_encoding(accept_encoding: str, encoders: dict) -> Optional[str]:
+    """The acceptable encoding with the highest q-value, ties going to the preferred one."""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
             try:
-                await super().__call__(scope, receive, send)
-            except RuntimeError as e:
-                if not await request.is_disconnected():
-                    Log.error(message=f'API call has failed! Error Message: {e}')
-                    raise e
-                Log.error(message=f'Client disconnected the API request! Error Message: {e}')
-                print("remote disconnected")
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    default = qualities.get("*", 0.0)
+    best = max(encoders, key=lambda name: qualities.get(name, default))
+    return best if qualities.get(best, default) > 0 else None
+
+
+def _variant_etag(etag: str, encoding: str) -> str:
+    """The ETag of the ``encoding`` representation, e.g. ``"abc"`` -> ``"abc-gzip"``."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts.
+
+    Bodies smaller than ``minimum_size``, already encoded bodies and
+    non-text content types are sent as they are; streamed bodies are
+    compressed chunk by chunk. Every response of a compressible type gets
+    ``Vary: Accept-Encoding``, compressed or not, so shared and browser
+    caches keep the variants apart. A response with a strong ETag is compressed
+    once per encoding: the compressed bytes are kept in an LRU keyed by
+    ``(ETag, encoding)`` so hot cached payloads are not recompressed.
+    """
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+                 cache_maxsize: int = COMPRESSION_CACHE_MAXSIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_maxsize = cache_maxsize
+        self.encoders = _available_encoders()
+        self._compressed = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        registry.register_cache(
+            "compressed_bodies", lambda: {"hit": self.cache_hits, "miss": self.cache_misses}
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        encoding = accept_encoding and _negotiate_encoding(accept_encoding, self.encoders)
+        if not encoding:
+            async def send_with_vary(message):
+                if message["type"] == "http.response.start":
+                    self._add_vary(MutableHeaders(scope=message))
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        start_message = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+            elif message["type"] == "http.response.body" and start_message is not None:
+                stream = await self._send_first_body(start_message, message, encoding, send)
+                start_message = None
+            elif message["type"] == "http.response.body" and stream is not None:
+                more_body = message.get("more_body", False)
+                body = stream.process(message.get("body", b""))
+                await send({
+                    "type": "http.response.body",
+                    "body": body if more_body else body + stream.finish(),
+                    "more_body": more_body,
+                })
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send_first_body(self, start_message, message, encoding: str, send):
+        """Send the response start and first body chunk, compressed if worthwhile.
+
+        Returns the stream encoder for the remaining chunks of a streamed body.
+        """
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=start_message)
+        self._add_vary(headers)
+        if not self._should_compress(start_message["status"], headers, body, more_body):
+            await send(start_message)
+            await send(message)
+            return None
+        etag = headers.get("etag")
+        stream = None
+        if more_body:
+            stream = self.encoders[encoding][1]()
+            body = stream.process(body)
+            del headers["content-length"]
         else:
-            await super().__call__(scope, receive, send)
+            body = self._compress(body, encoding, etag)
+            headers["content-length"] = str(len(body))
+        headers["content-encoding"] = encoding
+        if etag:
+            headers["etag"] = _variant_etag(etag, encoding)
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+        return stream
 
-    async def dispatch(self, request: Request, call_next):
-        authorization = request.headers.get('authorization')
-        request.state.is_authenticated = False
-        if authorization:
-            token = authorization.split(" ")[-1]
-            try:
-                payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-                client_id = payload.get('sub')
-                if not client_id or client_id != CLIENT_ID:
-                    raise HTTPException(status_code=401, detail="Invalid Token", headers={"WWW-Authenticate": "Bearer"})
-                request.state.is_authenticated = True
-            except InvalidTokenError as error:
-                Log.warning(data={'error': f'{error}'},
-                            message=f'Invalid Token | Path: {request.url.path} ')
-
-        response = await call_next(request)
-        return response
+    @staticmethod
+    def _add_vary(headers: MutableHeaders) -> None:
+        if headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            headers.add_vary_header("Accept-Encoding")
+
+    def _should_compress(self, status: int, headers: MutableHeaders, body: bytes,
+                         more_body: bool) -> bool:
+        if status in (204, 304) or "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    def _compress(self, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+        if not etag or etag.startswith("W/"):
+            return self.encoders[encoding][0](body)
+        key = (etag, encoding)
+        compressed = self._compressed.get(key)
+        if compressed is not None:
+            self.cache_hits += 1
+            self._compressed.move_to_end(key)
+            return compressed
+        self.cache_misses += 1
+        compressed = self.encoders[encoding][0](body)
+        self._compressed[key] = compressed
+        while len(self._compressed) > self.cache_maxsize:
+            self._compressed.popitem(last=False)
+        return compressed
+
+
+class MetricsMiddleware:
+    """Record the latency of every HTTP request by method, route template and status.
+
+    Requests that match no route are grouped under ``<unmatched>`` so that
+    arbitrary paths cannot grow the number of series.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                (scope["method"], getattr(route, "path", "<unmatched>"), status),
+                time.perf_counter() - started_at,
+            )
+
+
+class ProfilingMiddleware:
+    """Profile sampled requests with cProfile into ``utils.profiler.profile_store``.
+
+    A request is profiled when it carries ``PROFILE_HEADER`` set to
+    ``PROFILE_TOKEN``, or at random with ``PROFILE_SAMPLE_RATE``. A profiled
+    response gets an ``X-Profile-Id`` header pointing at
+    ``/admin/profiles/{id}``. Other requests only pay for the sampling check.
+    Admin requests carry the same header to authenticate and are never profiled.
+    """
+    def __init__(self, app, token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.header = PROFILE_HEADER.lower().encode()
+
+    def _sampled(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == self.header:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/admin/") or not self._sampled(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = profile_store.start(scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message)["x-profile-id"] = str(profile.id)
+            await send(message)
+
+        try:
+            with profile:
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile_store.finish(profile)
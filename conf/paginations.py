@@ -1,5 +1,22 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
 from math import ceil
-from typing import Union, Dict
+from typing import Union, Dict, List, Tuple
+
+from fastapi import HTTPException
+from tortoise import Tortoise
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+from conf.vars import JWT_SECRET
+from utils.metrics import timed_db
+
+
+NEXT = "next"
+PREVIOUS = "prev"
 
 
 class Pagination:
@@ -48,3 +65,125 @@ class Pagination:
             data=self.data
         )
         return data
+
+
+class CursorPagination:
+    """Keyset (cursor) pagination over ``(published_at, id)``.
+
+    Pages are read with ``WHERE published_at <= :published_at AND
+    (published_at < :published_at OR id < :id) ORDER BY published_at DESC,
+    id DESC LIMIT n``. The redundant first bound lets the database seek the
+    ``(published_at DESC, id DESC)`` index to the cursor, so every page costs
+    the same as the first. Cursors are opaque,
+    HMAC-signed tokens. Rows without a ``published_at`` have no position in
+    this ordering and are left out. ``get_paginated_data`` keeps the envelope
+    of ``Pagination``; ``nextPage``/``prevPage`` carry cursors and
+    ``totalCount`` is an optional estimate.
+    """
+
+    def __init__(self, limit, cursor: str = None, total_count: int = None):
+        self._page_size = limit
+        self._cursor = cursor
+        self._count = total_count
+        self._next_cursor = None
+        self._previous_cursor = None
+        self.data = []
+
+    @staticmethod
+    def _sign(payload: bytes) -> str:
+        digest = hmac.new((JWT_SECRET or "").encode(), payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+    @classmethod
+    def encode_cursor(cls, published_at: datetime, pk: int, direction: str = NEXT) -> str:
+        """Build a signed cursor pointing just past the given row."""
+        payload = json.dumps([published_at.isoformat(), pk, direction], separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return f"{encoded}.{cls._sign(encoded.encode())}"
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> Tuple[datetime, int, str]:
+        """Verify and unpack a cursor; raise a 400 ``HTTPException`` if it is invalid."""
+        try:
+            encoded, signature = cursor.split(".")
+            if not hmac.compare_digest(signature, cls._sign(encoded.encode())):
+                raise ValueError("bad signature")
+            published_at, pk, direction = json.loads(
+                base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError("bad direction")
+            return datetime.fromisoformat(published_at), int(pk), direction
+        except (ValueError, TypeError) as error:
+            raise HTTPException(status_code=400, detail="Invalid Cursor") from error
+
+    @timed_db("cursor_page")
+    async def paginate(self, queryset: QuerySet, *fields: str) -> List[dict]:
+        """Read the page addressed by the cursor from ``queryset`` as ``values()`` rows."""
+        queryset = queryset.filter(published_at__isnull=False)
+        direction = NEXT
+        if self._cursor:
+            published_at, pk, direction = self.decode_cursor(self._cursor)
+            if direction == NEXT:
+                queryset = queryset.filter(
+                    Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=pk),
+                    published_at__lte=published_at,
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(published_at__gt=published_at) | Q(published_at=published_at, id__gt=pk),
+                    published_at__gte=published_at,
+                )
+        ordering = ("-published_at", "-id") if direction == NEXT else ("published_at", "id")
+        fields = tuple(fields) + tuple(
+            name for name in ("published_at", "id") if name not in fields
+        )
+        rows = await queryset.order_by(*ordering).limit(self._page_size + 1).values(*fields)
+        has_more = len(rows) > self._page_size
+        rows = rows[:self._page_size]
+        if direction == PREVIOUS:
+            rows.reverse()
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or direction == PREVIOUS:
+                self._next_cursor = self.encode_cursor(last["published_at"], last["id"], NEXT)
+            if self._cursor and (has_more or direction == NEXT):
+                self._previous_cursor = self.encode_cursor(
+                    first["published_at"], first["id"], PREVIOUS
+                )
+        self.data = rows
+        return rows
+
+    @staticmethod
+    @timed_db("estimate_total")
+    async def estimate_total(table: str) -> Union[int, None]:
+        """Row count estimate from the Postgres planner statistics, without a ``COUNT(*)``.
+
+        Returns ``None`` on other databases or before the table was analyzed.
+        """
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect != "postgres":
+            return None
+        rows = await connection.execute_query_dict(
+            "SELECT reltuples::bigint AS estimate FROM pg_class WHERE relname = $1", [table]
+        )
+        if not rows or rows[0]["estimate"] < 0:
+            return None
+        return rows[0]["estimate"]
+
+    def get_paginated_data(self) -> Dict:
+        """
+        Generating the pagination data
+        return dictionary object
+        nextPage and prevPage are cursors, totalCount and pageCount are estimates or None
+        """
+        data = dict(
+            totalCount=self._count,
+            page=self._cursor,
+            limit=self._page_size,
+            nextPage=self._next_cursor,
+            prevPage=self._previous_cursor,
+            pageCount=ceil(self._count / self._page_size) if self._count is not None else None,
+            data=self.data
+        )
+        return data
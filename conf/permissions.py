@@ -1,5 +1,8 @@
+import hmac
+
 from fastapi import HTTPException, Request
 
+from conf.vars import PROFILE_HEADER, PROFILE_TOKEN
 from utils.log import Log
 
 
@@ -8,6 +11,23 @@ class IsAuthenticated:
 
     async def __call__(self, request: Request):
         if not request.state.is_authenticated:
-            Log.warning(message=f'Authentication Failed | path: {request.url.path}')
+            Log.warning(message=f'Authentication Failed | path: {request.url.path}',
+                        dedup_key=(request.url.path, 'AuthenticationFailed'))
             raise HTTPException(detail='Authentication Failed! Invalid Credentials!', status_code=401)
         return None
+
+
+class HasProfileToken:
+    """Permission Class For Admin Endpoints, requires ``PROFILE_HEADER`` set to ``PROFILE_TOKEN``.
+
+    Client tokens are held by every API consumer, so they do not grant admin access.
+    An empty ``PROFILE_TOKEN`` denies every request.
+    """
+
+    async def __call__(self, request: Request):
+        supplied = request.headers.get(PROFILE_HEADER, '').encode()
+        if not PROFILE_TOKEN or not hmac.compare_digest(supplied, PROFILE_TOKEN.encode()):
+            Log.warning(message=f'Admin Authentication Failed | path: {request.url.path}',
+                        dedup_key=(request.url.path, 'AdminAuthenticationFailed'))
+            raise HTTPException(detail='Permission Denied! Invalid Admin Credentials!', status_code=403)
+        return None
@@ -1,7 +1,20 @@
+import hashlib
 import json
-from fastapi.responses import JSONResponse
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.encoders import jsonable_encoder
 
+from utils.metrics import RENDER_DURATION
+
+
+def dumps(content) -> bytes:
+    """Serialize to compact UTF-8 JSON; datetimes are written as ISO 8601 strings."""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 
 async def custom_request_validation_exception_handler(_request, exc):
     """Custom handler for request validation exceptions."""
@@ -20,7 +33,7 @@ async def custom_request_validation_exception_handler(_request, exc):
         "detail": jsonable_encoder(error_detail),
         "data": None,
     }
-    return JSONResponse(content=jsonable_encoder(response_data), status_code=400)
+    return ORJSONResponse(content=response_data, status_code=400)
 
 
 async def custom_validation_error_handler(_request, exc):
@@ -28,15 +41,13 @@ async def custom_validation_error_handler(_request, exc):
     error_message = "Validation Error!"
     error_detail = {"source": exc.title, "description": json.loads(exc.json())}
     response_data = {"message": error_message, "detail": error_detail, "data": None}
-    return CustomJSONResponse(content=jsonable_encoder(response_data), status_code=400)
+    return CustomJSONResponse(content=response_data, status_code=400)
 
 
 async def custom_http_exception_handler(_request, exc):
     """Custom handler for HTTP exceptions."""
     response_data = {"success": False, "message": exc.detail, "data": None}
-    return JSONResponse(
-        content=jsonable_encoder(response_data), status_code=exc.status_code
-    )
+    return ORJSONResponse(content=response_data, status_code=exc.status_code)
 
 
 class CustomJSONResponse(JSONResponse):
@@ -48,19 +59,84 @@ class CustomJSONResponse(JSONResponse):
         self.message = message
         super().__init__(content=content, status_code=status_code, **kwargs)
 
-    def render(self, content):
-        is_success = 200 <= self.status_code < 300
-        custom_content = {
-            "success": is_success,
-            "message": self.message
-            or (is_success and "Request Success")
-            or "Request Failed",
-        }
-        if isinstance(content, dict) and "data" in content.keys():
-            custom_content.update(**content)
+    def render(self, content) -> bytes:
+        started_at = time.perf_counter()
+        body = self._render_envelope(content)
+        RENDER_DURATION.observe((), time.perf_counter() - started_at)
+        return body
+
+    def _render_envelope(self, content) -> bytes:
+        """Serialize the envelope and the content in a single ``orjson.dumps`` call.
+
+        A dict content with a ``data`` key is merged into the envelope, anything
+        else becomes its ``data``. A ``message`` inside ``data`` wins over the
+        response message. Only the top-level dict is rebuilt, nested data is
+        serialized in place.
+        """
+        success = 200 <= self.status_code < 300
+        message = self.message or (success and "Request Success") or "Request Failed"
+        if isinstance(content, dict) and "data" in content:
+            data = content["data"]
+            envelope = {"success": success, "message": message, **content}
         else:
-            custom_content["data"] = content
-        if isinstance(custom_content.get("data"), dict) \
-            and custom_content.get("data", {}).get("message"):
-            custom_content["message"] = custom_content["data"]["message"]
-        return super().render(custom_content)
+            data = content
+            envelope = {"success": success, "message": message, "data": content}
+        if isinstance(data, dict) and data.get("message"):
+            envelope["message"] = data["message"]
+        return dumps(envelope)
+
+
+class RenderedResponseCache:
+    """Rendered response bodies with a strong ETag, keyed by request.
+
+    An entry is reused for as long as it was rendered from the very same
+    payload objects, i.e. until the upstream cache entry behind it has been
+    replaced, so a repeated request costs neither serialization nor hashing.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[tuple, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def response(self, key: Hashable, sources: tuple, render: Callable[[], Response],
+                 max_age: float, headers: dict = None) -> Response:
+        """The response for ``key``, rendering it only if ``sources`` changed.
+
+        ``render`` builds the response from ``sources``; its body is cached and
+        served with ``ETag`` and ``Cache-Control: private, max-age``.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and len(entry[0]) == len(sources) \
+                and all(cached is source for cached, source in zip(entry[0], sources)):
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            body = render().body
+            entry = (sources, body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return Response(
+            content=entry[1],
+            media_type="application/json",
+            headers={
+                **(headers or {}),
+                "ETag": entry[2],
+                "Cache-Control": f"private, max-age={int(max_age)}",
+            },
+        )
+
+    def stats(self) -> dict:
+        """Lookup counts by result."""
+        return {"hit": self.hits, "miss": self.misses}
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
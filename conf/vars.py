@@ -6,19 +6,93 @@ load_dotenv()
 
 # NEWS API
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2")
+NEWS_API_TIMEOUT = float(os.getenv("NEWS_API_TIMEOUT", "10"))
+NEWS_API_CONNECT_TIMEOUT = float(os.getenv("NEWS_API_CONNECT_TIMEOUT", "5"))
+NEWS_API_MAX_CONNECTIONS = int(os.getenv("NEWS_API_MAX_CONNECTIONS", "100"))
+NEWS_API_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("NEWS_API_MAX_KEEPALIVE_CONNECTIONS", "20"))
+NEWS_API_KEEPALIVE_EXPIRY = float(os.getenv("NEWS_API_KEEPALIVE_EXPIRY", "30"))
+NEWS_API_MAX_PAGE_SIZE = int(os.getenv("NEWS_API_MAX_PAGE_SIZE", "100"))
+NEWS_API_PAGE_CONCURRENCY = int(os.getenv("NEWS_API_PAGE_CONCURRENCY", "4"))
+# Results the NewsAPI plan lets a search page through (100 on the Developer plan, 0 = no cap)
+NEWS_API_MAX_RESULTS = int(os.getenv("NEWS_API_MAX_RESULTS", "0"))
+NEWS_SEARCH_MAX_LIMIT = int(os.getenv("NEWS_SEARCH_MAX_LIMIT", "1000"))
 
-# POSTGRES DB
+# NEWS API QUOTA (rate in calls per second, budget in calls per UTC day, 0 = uncapped)
+NEWS_API_RATE = float(os.getenv("NEWS_API_RATE", "5"))
+NEWS_API_BURST = int(os.getenv("NEWS_API_BURST", "10"))
+NEWS_API_DAILY_BUDGET = int(os.getenv("NEWS_API_DAILY_BUDGET", "0"))
+NEWS_API_BACKGROUND_RESERVE = float(os.getenv("NEWS_API_BACKGROUND_RESERVE", "0.1"))
+NEWS_API_INTERACTIVE_MAX_WAIT = float(os.getenv("NEWS_API_INTERACTIVE_MAX_WAIT", "5"))
+NEWS_API_BACKGROUND_MAX_WAIT = float(os.getenv("NEWS_API_BACKGROUND_MAX_WAIT", "30"))
+# Pause after a rateLimited reply without a Retry-After header, in seconds
+NEWS_API_RATE_LIMIT_BACKOFF = float(os.getenv("NEWS_API_RATE_LIMIT_BACKOFF", "60"))
+
+# NEWS API CIRCUIT BREAKER (timeout in seconds)
+NEWS_API_BREAKER_FAILURE_THRESHOLD = int(os.getenv("NEWS_API_BREAKER_FAILURE_THRESHOLD", "5"))
+NEWS_API_BREAKER_RECOVERY_TIMEOUT = float(os.getenv("NEWS_API_BREAKER_RECOVERY_TIMEOUT", "30"))
+NEWS_API_BREAKER_HALF_OPEN_CALLS = int(os.getenv("NEWS_API_BREAKER_HALF_OPEN_CALLS", "1"))
+NEWS_FALLBACK_ARTICLE_LIMIT = int(os.getenv("NEWS_FALLBACK_ARTICLE_LIMIT", "20"))
+
+# NEWS API RESPONSE CACHE (TTLs in seconds, sizes in entries)
+NEWS_CACHE_COUNTRY_TTL = float(os.getenv("NEWS_CACHE_COUNTRY_TTL", "300"))
+NEWS_CACHE_COUNTRY_MAXSIZE = int(os.getenv("NEWS_CACHE_COUNTRY_MAXSIZE", "32"))
+NEWS_CACHE_SOURCE_TTL = float(os.getenv("NEWS_CACHE_SOURCE_TTL", "300"))
+NEWS_CACHE_SOURCE_MAXSIZE = int(os.getenv("NEWS_CACHE_SOURCE_MAXSIZE", "256"))
+NEWS_CACHE_SEARCH_TTL = float(os.getenv("NEWS_CACHE_SEARCH_TTL", "120"))
+NEWS_CACHE_SEARCH_MAXSIZE = int(os.getenv("NEWS_CACHE_SEARCH_MAXSIZE", "1024"))
+NEWS_CACHE_STALE_TTL = float(os.getenv("NEWS_CACHE_STALE_TTL", "600"))
+NEWS_RENDER_CACHE_MAXSIZE = int(os.getenv("NEWS_RENDER_CACHE_MAXSIZE", "256"))
+
+# RESPONSE COMPRESSION (sizes in bytes; brotli is used when the package is installed)
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_CACHE_MAXSIZE = int(os.getenv("COMPRESSION_CACHE_MAXSIZE", "256"))
+
+# REQUEST PROFILING (requests carrying PROFILE_HEADER set to PROFILE_TOKEN are always profiled,
+# others with probability PROFILE_SAMPLE_RATE; an empty token disables the header)
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+
+# AUTHORIZATION CODES (backend "memory" keeps codes per process, "sqlite" shares the
+# AUTH_CODE_SQLITE_PATH file between workers; TTL in seconds)
+AUTH_CODE_BACKEND = os.getenv("AUTH_CODE_BACKEND", "memory")
+AUTH_CODE_TTL = float(os.getenv("AUTH_CODE_TTL", "300"))
+AUTH_CODE_MAXSIZE = int(os.getenv("AUTH_CODE_MAXSIZE", "100000"))
+AUTH_CODE_SHARDS = int(os.getenv("AUTH_CODE_SHARDS", "16"))
+AUTH_CODE_SQLITE_PATH = os.getenv("AUTH_CODE_SQLITE_PATH", "auth_codes.sqlite3")
+
+# POSTGRES DB ("sqlite" keeps the data in the DB_NAME file instead, for local runs and load tests)
+DB_ENGINE = os.getenv("DB_ENGINE", "postgres")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 DB_USERNAME = os.getenv("DB_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# ARCHIVE SEARCH ("auto" picks Postgres full-text search when available, else "local")
+ARTICLE_SEARCH_MODE = os.getenv("ARTICLE_SEARCH_MODE", "auto")
+
 # CLIENT INFO
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 
 # MISC
 JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_CACHE_MAXSIZE = int(os.getenv("JWT_CACHE_MAXSIZE", "1024"))
 LOGGER_TO_USE = os.getenv("LOGGER_TO_USE", "local")
+LOG_CALLER_INFO = os.getenv("LOG_CALLER_INFO", "true").lower() in ("1", "true", "yes")
+# Records are handed to a listener thread through a queue of this size (0 logs in place);
+# a full queue either drops records ("drop") or waits for room ("block")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_OVERFLOW = os.getenv("LOG_QUEUE_OVERFLOW", "drop")
+# Repeats of a deduplicated log within this many seconds are counted instead of written (0 disables)
+LOG_DEDUP_WINDOW = float(os.getenv("LOG_DEDUP_WINDOW", "60"))
+LOG_DEDUP_MAXSIZE = int(os.getenv("LOG_DEDUP_MAXSIZE", "1024"))
+# The log listener thread writes the suppressed counts of closed windows this often (needs LOG_QUEUE_SIZE > 0)
+LOG_DEDUP_FLUSH_INTERVAL = float(os.getenv("LOG_DEDUP_FLUSH_INTERVAL", "5"))
 DEFAULT_CLIENT_HASH = "6f7517d93cdaaecaa64f3052d135539e"
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse
@@ -7,17 +9,28 @@ from tortoise.contrib.fastapi import register_tortoise
 from pydantic import ValidationError
 
 from conf.database import TORTOISE_CONFIG
-from conf.middlewares import AuthenticationMiddleware
+from conf.middlewares import (
+    AuthenticationMiddleware,
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+)
 from conf.response import (
     custom_request_validation_exception_handler,
     custom_http_exception_handler,
     CustomJSONResponse,
     custom_validation_error_handler,
 )
-from routers import news_router, auth_router
+from routers import news_router, auth_router, metrics_router, admin_router
+from utils.code_store import code_store
+from utils.log import shutdown_logging
+from utils.news_api_client import news_api_client
 
 
 middleware = [
+    Middleware(MetricsMiddleware),
+    Middleware(ProfilingMiddleware),
     Middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -25,6 +38,8 @@ middleware = [
         allow_methods=["*"],
         allow_headers=["*"],
     ),
+    Middleware(ConditionalGetMiddleware),
+    Middleware(CompressionMiddleware),
     Middleware(AuthenticationMiddleware),
 ]
 
@@ -39,9 +54,20 @@ exceptions = {
 }
 
 
-app = FastAPI(middleware=middleware, exception_handlers=exceptions)
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Release the shared News API connection pool and code store and flush the logs on shutdown."""
+    yield
+    await news_api_client.close()
+    await code_store.close()
+    shutdown_logging()
+
+
+app = FastAPI(middleware=middleware, exception_handlers=exceptions, lifespan=lifespan)
 app.include_router(news_router)
 app.include_router(auth_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 @app.exception_handler(RequestValidationError)
@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "article" ADD COLUMN IF NOT EXISTS "search_vector" TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce("title", '')), 'A') ||
+        setweight(to_tsvector('english', coalesce("author", '')), 'B') ||
+        setweight(to_tsvector('english', coalesce("description", '')), 'C')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS "idx_article_search_vector" ON "article" USING GIN ("search_vector");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_article_search_vector";
+ALTER TABLE "article" DROP COLUMN IF EXISTS "search_vector";"""
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "article" ADD COLUMN IF NOT EXISTS "identity" VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS "uid_article_identity" ON "article" ("identity");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "uid_article_identity";
+ALTER TABLE "article" DROP COLUMN IF EXISTS "identity";"""
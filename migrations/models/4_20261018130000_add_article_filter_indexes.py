@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_article_author" ON "article" ("author");
+CREATE INDEX IF NOT EXISTS "idx_article_created_at" ON "article" ("created_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_article_author";
+DROP INDEX IF EXISTS "idx_article_created_at";"""
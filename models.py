@@ -1,9 +1,27 @@
+import hashlib
+
 from tortoise import fields
+from tortoise.indexes import Index
 from tortoise.models import Model
 
 
+class DescendingIndex(Index):
+    """Index with every column in descending order, for newest-first scans."""
+
+    def describe(self) -> dict:
+        return {**super().describe(), "order": "DESC"}
+
+    def get_sql(self, schema_generator, model, safe: bool) -> str:
+        sql = super().get_sql(schema_generator, model, safe)
+        columns = [schema_generator.quote(field) for field in self.fields]
+        return sql.replace(
+            f"({', '.join(columns)})", f"({', '.join(f'{column} DESC' for column in columns)})", 1
+        )
+
+
 class Article(Model):
     id = fields.BigIntField(primary_key=True, auto=True)
+    identity = fields.CharField(max_length=64, null=True, unique=True)
     title = fields.CharField(max_length=255, null=False)
     author = fields.CharField(max_length=255, null=True)
     description = fields.TextField(null=True)
@@ -14,7 +32,20 @@ class Article(Model):
     class Meta:
         table = "article"
         default_connection = "default"
-    
+        indexes = (
+            # Keyset pagination over (published_at, id), see conf.paginations.CursorPagination
+            DescendingIndex(fields=("published_at", "id"), name="idx_article_published_at_id"),
+            # Filters of the /news/saved listing, see utils.article_store.filter_articles
+            Index(fields=("author",), name="idx_article_author"),
+            Index(fields=("created_at",), name="idx_article_created_at"),
+        )
+
+    @staticmethod
+    def identity_for(url: str = None, title: str = None, published_at: str = None) -> str:
+        """Stable identity of a NewsAPI article: its URL, else its title and publication time."""
+        key = url or f"{title}|{published_at}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
     def to_json(self):
         return {
             "id": self.id,
@@ -1,2 +1,4 @@
 from .news import router as news_router
 from .auth import router as auth_router
+from .metrics import router as metrics_router
+from .admin import router as admin_router
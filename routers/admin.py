@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Request, Path, Depends
+from fastapi.security import OAuth2AuthorizationCodeBearer
+
+from conf.permissions import IsAuthenticated, HasProfileToken
+from conf.response import CustomJSONResponse
+from utils.profiler import profile_store
+
+
+oauth2_scheme = OAuth2AuthorizationCodeBearer(authorizationUrl="code", tokenUrl="token")
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(oauth2_scheme), Depends(IsAuthenticated()), Depends(HasProfileToken())],
+)
+
+
+@router.get("/profiles")
+async def list_profiles(_request: Request):
+    """List the stored request profiles, newest first."""
+    return CustomJSONResponse(content=profile_store.list())
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(_request: Request, profile_id: int = Path(...)):
+    """Get a request profile with its top functions by cumulative time."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return CustomJSONResponse(content=None, message="Profile Not Found", status_code=404)
+    return CustomJSONResponse(content=profile)
@@ -1,9 +1,10 @@
 import hashlib
 import random
+import secrets
 import string
 from fastapi import APIRouter, Request, HTTPException
-from cachetools import TTLCache
 
+from utils.code_store import code_store
 from utils.token import generate_access_token
 from conf.response import CustomJSONResponse
 from conf.vars import DEFAULT_CLIENT_HASH
@@ -15,18 +16,16 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-cache = TTLCache(maxsize=5, ttl=300)
-
 
 @router.get("/code")
 async def get_code(_request: Request, client_id: str):
     """Endpoint to get a code."""
     length = random.randint(8, 10)
     code = ''.join(
-        random.choice(string.ascii_uppercase + string.digits + string.ascii_lowercase)
+        secrets.choice(string.ascii_uppercase + string.digits + string.ascii_lowercase)
         for _ in range(length)
     )
-    cache[client_id] = code
+    await code_store.put(code, client_id)
     return CustomJSONResponse(content={"code": code})
 
 
@@ -39,10 +38,9 @@ async def get_token(_request: Request, client_id: str, client_secret: str, code:
     client_hash = md5_hash.hexdigest()
     if client_hash != DEFAULT_CLIENT_HASH:
         raise HTTPException(status_code=400, detail="Client Not Found")
-    cached_code = cache.get(client_id)
-    if not cached_code:
-        raise HTTPException(status_code=400, detail="Code Expired")
-    if code != cached_code:
+    # Codes are single use, even when presented by the wrong client
+    issued_to = await code_store.pop(code)
+    if issued_to != client_id:
         raise HTTPException(status_code=400, detail="Invalid Code")
     access_token = generate_access_token()
     return CustomJSONResponse(content={"token": access_token})
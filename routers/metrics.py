@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import registry
+
+
+router = APIRouter(
+    prefix="",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(_request: Request):
+    """Endpoint to scrape the metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
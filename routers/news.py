@@ -1,10 +1,17 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Request, Path, Query, Depends
 from fastapi.security import OAuth2AuthorizationCodeBearer
 
 from conf.permissions import IsAuthenticated
+from conf.vars import NEWS_SEARCH_MAX_LIMIT
 from views import (
     get_news_view,
+    export_news_view,
     save_latest_news_view,
+    search_saved_articles_view,
+    list_saved_articles_view,
+    get_saved_article_view,
     get_headlines_by_country_view,
     get_headlines_by_source_view,
     get_headlines_by_filter_view,
@@ -26,18 +33,68 @@ async def get_news(
     _request: Request,
     search: str = Query(..., min_length=1),
     page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1),
+    limit: int = Query(10, ge=1, le=NEWS_SEARCH_MAX_LIMIT),
 ):
     """Get news headlines with pagination."""
     return await get_news_view(search=search, page=page, limit=limit)
 
 
+@router.get("/export")
+async def export_news(
+    _request: Request,
+    search: str = Query(..., min_length=1),
+    max_pages: int = Query(None, ge=1),
+):
+    """Stream every search result as newline-delimited JSON."""
+    return await export_news_view(search=search, max_pages=max_pages)
+
+
 @router.post("/save-latest")
 async def save_latest_news(_request: Request):
     """Save the top three latest news headlines."""
     return await save_latest_news_view()
 
 
+@router.get("/saved")
+async def list_saved_articles(
+    _request: Request,
+    cursor: str = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+    author: str = Query(None),
+    published_from: datetime = Query(None),
+    published_to: datetime = Query(None),
+    created_from: datetime = Query(None),
+    created_to: datetime = Query(None),
+):
+    """List the saved articles, newest first."""
+    return await list_saved_articles_view(
+        cursor=cursor,
+        limit=limit,
+        author=author,
+        published_from=published_from,
+        published_to=published_to,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+@router.get("/saved/search")
+async def search_saved_articles(
+    _request: Request,
+    search: str = Query(..., min_length=1),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Full-text search the saved articles by title, author and description."""
+    return await search_saved_articles_view(search=search, page=page, limit=limit)
+
+
+@router.get("/saved/{article_id}")
+async def get_saved_article(_request: Request, article_id: int = Path(...)):
+    """Get a saved article by ID."""
+    return await get_saved_article_view(article_id=article_id)
+
+
 @router.get("/headlines/country/{country_code}")
 async def get_headlines_by_country(_request: Request, country_code: AllowedCountryCodes = Path(...)):
     """Get news headlines by country code."""
@@ -1,12 +1,16 @@
 import asyncio
 from datetime import datetime
 
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from tortoise import Tortoise
 
 from test_config import TEST_DB_CONFIG, MOCK_NEWS_RESPONSE, TEST_VALID_TOKEN
 from main import app
+from utils.log import throttle
+from utils.news_api_client import NewsAPI
 
 
 @pytest.fixture(scope="session")
@@ -21,7 +25,7 @@ def event_loop():
         loop.close()
 
 
-@pytest.fixture(scope="session")
+@pytest_asyncio.fixture(scope="session")
 async def initialize_tests(event_loop):
     """Initialize test database and close properly"""
     await Tortoise.init(config=TEST_DB_CONFIG)
@@ -32,7 +36,7 @@ async def initialize_tests(event_loop):
     await Tortoise.close_connections()
 
 
-@pytest.fixture(scope="function")
+@pytest_asyncio.fixture(scope="function")
 async def test_db(initialize_tests):
     """Create a fresh database connection for each test."""
     connection = Tortoise.get_connection("default")
@@ -43,6 +47,13 @@ async def test_db(initialize_tests):
     await connection.execute_query("DELETE FROM article")  # Clean up after each test
 
 
+@pytest.fixture(autouse=True)
+def reset_log_throttle():
+    """Forget deduplicated log keys so a test's repeats are not summarised after it."""
+    yield
+    throttle.drain()
+
+
 @pytest.fixture(scope="session")
 def test_app():
     client = TestClient(app)
@@ -76,11 +87,17 @@ def mock_datetime():
 
 
 @pytest.fixture
-def mock_newsapi_client(mocker):
-    """Mock NewsAPI client for testing."""
-    mock = mocker.patch("newsapi.NewsApiClient")
-    mock_instance = mocker.MagicMock()
-    mock_instance.get_everything.return_value = MOCK_NEWS_RESPONSE
-    mock_instance.get_top_headlines.return_value = MOCK_NEWS_RESPONSE
-    mock.return_value = mock_instance
-    return mock_instance
+def mock_newsapi_client():
+    """NewsAPI client backed by a mock transport that records upstream requests."""
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json=MOCK_NEWS_RESPONSE)
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="https://newsapi.test/v2"
+    )
+    news_api = NewsAPI(client=client)
+    news_api.requests = requests
+    return news_api
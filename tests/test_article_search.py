@@ -0,0 +1,87 @@
+import json
+from datetime import datetime, timedelta
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytz
+
+from models import Article
+from utils.article_search import ArticleSearch
+from views import search_saved_articles_view
+
+
+async def _create_articles():
+    now = datetime.now(pytz.UTC)
+    await Article.create(
+        title="Election results announced", author="Jane Doe",
+        description="Final count of the vote", published_at=now - timedelta(days=2),
+    )
+    await Article.create(
+        title="Weather update", author="Election Desk",
+        description="Storms expected", published_at=now - timedelta(days=1),
+    )
+    await Article.create(
+        title="Markets rally", author="John Roe",
+        description="Stocks climb after the election", published_at=now,
+    )
+    await Article.create(title="Sports roundup", author=None, description=None)
+
+
+@pytest.mark.asyncio
+async def test_local_search_ranks_title_matches_first(test_db):
+    """Test title matches outrank author and description matches."""
+    await _create_articles()
+
+    total, rows = await ArticleSearch(mode="local").search(query="election", page=1, limit=10)
+
+    assert total == 3
+    assert [row["title"] for row in rows] == [
+        "Election results announced", "Weather update", "Markets rally"
+    ]
+    assert rows[0]["rank"] > rows[1]["rank"] > rows[2]["rank"]
+
+
+@pytest.mark.asyncio
+async def test_local_search_paginates(test_db):
+    """Test search results are sliced by page and limit."""
+    await _create_articles()
+
+    total, rows = await ArticleSearch(mode="local").search(query="election", page=2, limit=2)
+
+    assert total == 3
+    assert [row["title"] for row in rows] == ["Markets rally"]
+
+
+@pytest.mark.asyncio
+async def test_auto_search_falls_back_without_the_search_vector_column(test_db):
+    """Test Postgres without the migrated search_vector column is searched in local mode."""
+    await _create_articles()
+    connection = AsyncMock()
+    connection.capabilities.dialect = "postgres"
+    connection.execute_query_dict.return_value = []
+    search = ArticleSearch(mode="auto")
+
+    with patch("utils.article_search.Tortoise.get_connection", return_value=connection):
+        total, rows = await search.search(query="election", page=1, limit=10)
+        await search.search(query="markets", page=1, limit=10)
+
+    assert total == 3
+    assert rows[0]["title"] == "Election results announced"
+    # The column is looked up once, the searches themselves never hit the Postgres query
+    connection.execute_query_dict.assert_awaited_once()
+    assert "information_schema.columns" in connection.execute_query_dict.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_search_saved_articles_view(test_db):
+    """Test the search view wraps ranked results in the pagination envelope."""
+    await _create_articles()
+
+    response = await search_saved_articles_view(search="election", page=1, limit=2)
+    assert response.status_code == 200
+    body = json.loads(response.body)
+    assert body["totalCount"] == 3
+    assert body["nextPage"] == 2
+    assert body["data"][0]["title"] == "Election results announced"
+    assert isinstance(body["data"][0]["published_at"], str)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from models import Article
+from utils.article_store import save_articles, filter_articles
+from views import list_saved_articles_view, get_saved_article_view
+
+
+@pytest.mark.asyncio
+async def test_save_articles_is_idempotent(test_db, mock_news_api_response):
+    """Test saving splits inserted and already stored articles."""
+    articles = mock_news_api_response["articles"]
+    inserted, existing = await save_articles(articles[:1])
+    assert [row["title"] for row in inserted] == ["Test Article 1"]
+    assert existing == []
+
+    inserted, existing = await save_articles(articles)
+    assert [row["title"] for row in inserted] == ["Test Article 2"]
+    assert [row["title"] for row in existing] == ["Test Article 1"]
+    assert await Article.all().count() == 2
+
+
+@pytest.mark.asyncio
+async def test_save_articles_deduplicates_within_a_batch(test_db):
+    """Test repeated articles in one batch are stored once."""
+    article = {"title": "No URL", "publishedAt": "2025-04-18T12:00:00Z"}
+
+    inserted, existing = await save_articles([article, dict(article)])
+    assert len(inserted) == 1
+    assert existing == []
+    assert inserted[0]["identity"] == Article.identity_for(
+        title="No URL", published_at="2025-04-18T12:00:00Z"
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_insert_each_article_once(test_db, mock_news_api_response):
+    """Test concurrent saves of the same articles report each one inserted by one call only."""
+    articles = mock_news_api_response["articles"]
+    results = await asyncio.gather(*(save_articles(articles) for _ in range(3)))
+
+    inserted = [row["title"] for rows, _ in results for row in rows]
+    assert sorted(inserted) == ["Test Article 1", "Test Article 2"]
+    assert sum(len(existing) for _, existing in results) == 4
+    assert await Article.all().count() == 2
+
+
+@pytest.mark.asyncio
+async def test_save_articles_with_no_articles(test_db):
+    """Test an empty batch writes nothing."""
+    assert await save_articles([]) == ([], [])
+
+
+@pytest.mark.asyncio
+async def test_filter_articles_by_author_and_window(test_db):
+    """Test stored articles are narrowed by author and publication window."""
+    now = datetime.now(pytz.UTC)
+    await Article.create(title="Old", author="Jane Doe", published_at=now - timedelta(days=3))
+    await Article.create(title="New", author="Jane Doe", published_at=now)
+    await Article.create(title="Other", author="John Roe", published_at=now)
+
+    titles = await filter_articles(author="Jane Doe").values_list("title", flat=True)
+    assert sorted(titles) == ["New", "Old"]
+
+    titles = await filter_articles(
+        author="Jane Doe", published_from=now - timedelta(days=1)
+    ).values_list("title", flat=True)
+    assert titles == ["New"]
+
+
+@pytest.mark.asyncio
+async def test_list_saved_articles_view(test_db):
+    """Test the listing view pages filtered articles by cursor."""
+    now = datetime.now(pytz.UTC)
+    for day in range(3):
+        await Article.create(title=f"Day {day}", author="Jane Doe", published_at=now - timedelta(days=day))
+    await Article.create(title="Other", author="John Roe", published_at=now)
+
+    response = await list_saved_articles_view(limit=2, author="Jane Doe")
+    body = json.loads(response.body)
+    assert [row["title"] for row in body["data"]] == ["Day 0", "Day 1"]
+    assert body["totalCount"] is None
+
+    response = await list_saved_articles_view(cursor=body["nextPage"], limit=2, author="Jane Doe")
+    body = json.loads(response.body)
+    assert [row["title"] for row in body["data"]] == ["Day 2"]
+    assert body["nextPage"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_saved_article_view(test_db):
+    """Test a stored article is returned by id and a missing one is a 404."""
+    article = await Article.create(title="Stored", published_at=datetime.now(pytz.UTC))
+
+    response = await get_saved_article_view(article.id)
+    assert json.loads(response.body)["data"]["title"] == "Stored"
+
+    response = await get_saved_article_view(article.id + 1)
+    assert response.status_code == 404
@@ -52,6 +52,31 @@ def test_get_token_invalid_code(test_app: TestClient):
     assert "Invalid Code" in response.json()["message"]
 
 
+def test_get_token_code_is_single_use(test_app: TestClient):
+    """Test a code cannot be exchanged for a token twice."""
+    code = test_app.get("/code", params={"client_id": "demo-client"}).json()["data"]["code"]
+    params = {"client_id": "demo-client", "client_secret": "C51D80D50A15DF7D", "code": code}
+
+    assert test_app.get("/token", params=params).status_code == 200
+    response = test_app.get("/token", params=params)
+    assert response.status_code == 400
+    assert "Invalid Code" in response.json()["message"]
+
+
+def test_get_token_accepts_concurrently_issued_codes(test_app: TestClient):
+    """Test a newer code does not invalidate an older one of the same client."""
+    codes = [
+        test_app.get("/code", params={"client_id": "demo-client"}).json()["data"]["code"]
+        for _ in range(3)
+    ]
+    for code in codes:
+        response = test_app.get(
+            "/token",
+            params={"client_id": "demo-client", "client_secret": "C51D80D50A15DF7D", "code": code},
+        )
+        assert response.status_code == 200
+
+
 def test_get_token_invalid_client(test_app: TestClient):
     """Test token generation with invalid client credentials."""
     response = test_app.get(
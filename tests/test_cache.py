@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from utils.cache import ResponseCache, MISSING, FRESH, STALE
+
+
+class FakeTimer:
+    """Manually advanced clock for cache tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_response_cache_ttl_and_stale_window():
+    """Test entries move from fresh to stale to missing."""
+    timer = FakeTimer()
+    cache = ResponseCache(maxsize=2, ttl=10, stale_ttl=5, timer=timer)
+    cache.set("key", "value")
+
+    assert cache.lookup("key") == ("value", FRESH)
+    timer.now = 12
+    assert cache.lookup("key") == ("value", STALE)
+    timer.now = 16
+    assert cache.lookup("key") == (MISSING, None)
+    assert cache.peek("key") == "value"
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 1)
+
+
+def test_response_cache_lru_eviction():
+    """Test the least recently used entry is evicted first."""
+    cache = ResponseCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.lookup("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_response_cache_revalidate_runs_once_per_key():
+    """Test concurrent revalidations of one key share a single refresh."""
+    cache = ResponseCache(maxsize=2, ttl=10)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return "fresh"
+
+    first = cache.revalidate("key", fetch)
+    second = cache.revalidate("key", fetch)
+    assert first is second
+    await first
+
+    assert len(calls) == 1
+    assert cache.lookup("key") == ("fresh", FRESH)
+
+
+@pytest.mark.asyncio
+async def test_response_cache_revalidate_failure_keeps_entry():
+    """Test a failed refresh leaves the stale entry in place."""
+    timer = FakeTimer()
+    cache = ResponseCache(maxsize=2, ttl=10, stale_ttl=10, timer=timer)
+    cache.set("key", "old")
+    timer.now = 15
+
+    async def fetch():
+        raise RuntimeError("upstream down")
+
+    await cache.revalidate("key", fetch)
+    assert cache.lookup("key") == ("old", STALE)
@@ -0,0 +1,99 @@
+import httpx
+import pytest
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpen
+from utils.news_api_client import NewsAPI
+
+
+class FakeTimer:
+    """Manually advanced clock for circuit breaker tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    """Test the circuit opens once the failure threshold is reached."""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, timer=FakeTimer())
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(False)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_circuit_breaker_success_resets_failures():
+    """Test a success in between failures keeps the circuit closed."""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, timer=FakeTimer())
+    for healthy in (False, True, False):
+        breaker.before_call()
+        breaker.record(healthy)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_half_open_trial():
+    """Test the half-open state allows limited trials and closes on success."""
+    timer = FakeTimer()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, timer=timer)
+    breaker.before_call()
+    breaker.record(False)
+
+    timer.now = 11
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.is_open is False
+
+
+def test_circuit_breaker_half_open_failure_reopens():
+    """Test a failed trial re-opens the circuit."""
+    timer = FakeTimer()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, timer=timer)
+    breaker.before_call()
+    breaker.record(False)
+
+    timer.now = 11
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+@pytest.mark.asyncio
+async def test_news_api_fails_fast_while_circuit_open(mock_news_api_response):
+    """Test NewsAPI stops calling a failing upstream and keeps the last good payload."""
+    responses = [httpx.Response(200, json=mock_news_api_response)]
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return responses.pop(0) if responses else httpx.Response(503, text="unavailable")
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="https://newsapi.test/v2"
+    )
+    news_api = NewsAPI(client=client)
+    news_api.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    await news_api.get_headlines_by_country(country_code="us")
+
+    for _ in range(4):
+        assert await news_api.get_headlines_by_source(source_id="cnn") is None
+
+    assert len(requests) == 3
+    assert news_api.breaker.is_open is True
+    fallback = news_api.last_good_headlines(country_code="us", source_id="cnn")
+    assert [article["source"]["id"] for article in fallback] == ["cnn"]
+    fallback = news_api.last_good_headlines(country_code="us", source_id="CNN")
+    assert [article["source"]["id"] for article in fallback] == ["cnn"]
+    assert news_api.last_good_headlines(source_id="cnn") is None
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from utils.code_store import MemoryCodeStore, SQLiteCodeStore
+
+
+class FakeTimer:
+    """Manually advanced clock for code store tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_memory_code_store_pop_is_single_use():
+    """Test a code resolves to its client once, independently of other codes."""
+    store = MemoryCodeStore(ttl=300, maxsize=100, shards=4)
+    await store.put("first", "client")
+    await store.put("second", "client")
+
+    assert await store.pop("second") == "client"
+    assert await store.pop("second") is None
+    assert await store.pop("first") == "client"
+    assert await store.pop("unknown") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_code_store_expiry():
+    """Test codes expire after the TTL and are purged without a lookup."""
+    timer = FakeTimer()
+    store = MemoryCodeStore(ttl=10, maxsize=100, shards=1, timer=timer)
+    await store.put("code-a", "a")
+    timer.now += 5
+    await store.put("code-b", "b")
+    timer.now += 6
+    await store.put("code-c", "c")
+
+    assert len(store) == 2
+    assert await store.pop("code-a") is None
+    assert await store.pop("code-b") == "b"
+
+
+@pytest.mark.asyncio
+async def test_memory_code_store_full_shard_drops_oldest_code():
+    """Test a full shard makes room by dropping the code closest to expiry."""
+    timer = FakeTimer()
+    store = MemoryCodeStore(ttl=300, maxsize=2, shards=1, timer=timer)
+    for client in ("a", "b", "c"):
+        await store.put(f"code-{client}", client)
+        timer.now += 1
+
+    assert len(store) == 2
+    assert await store.pop("code-a") is None
+    assert await store.pop("code-c") == "c"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_code_store_is_shared_between_instances(tmp_path):
+    """Test a code stored by one process is popped once by another."""
+    timer = FakeTimer()
+    path = str(tmp_path / "codes.sqlite3")
+    writer = SQLiteCodeStore(path, ttl=10, timer=timer)
+    readers = [SQLiteCodeStore(path, ttl=10, timer=timer) for _ in range(3)]
+    await writer.put("expiring", "client")
+    timer.now += 11
+    await writer.put("code", "client")
+
+    assert await readers[0].pop("expiring") is None
+    results = await asyncio.gather(*(reader.pop("code") for reader in readers))
+    assert results.count("client") == 1 and results.count(None) == 2
+
+    for store in (writer, *readers):
+        await store.close()
@@ -0,0 +1,98 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from conf.middlewares import MetricsMiddleware
+from utils.metrics import MetricsRegistry, REQUEST_DURATION, UPSTREAM_ERRORS, registry
+from utils.news_api_client import NewsAPI, news_api_client
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram observations are rendered as cumulative buckets."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(("/news",), value)
+
+    text = registry.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{route="/news",le="0.1"} 2' in text
+    assert 'test_seconds_bucket{route="/news",le="1"} 3' in text
+    assert 'test_seconds_bucket{route="/news",le="+Inf"} 4' in text
+    assert 'test_seconds_sum{route="/news"} 2.65' in text
+    assert 'test_seconds_count{route="/news"} 4' in text
+
+
+def test_registry_reports_cache_hit_ratio():
+    """Test registered caches are read at render time."""
+    registry = MetricsRegistry()
+    stats = {"hit": 3, "stale": 1, "miss": 4}
+    registry.register_cache("news_country", lambda: stats)
+
+    text = registry.render()
+    assert 'cache_requests_total{cache="news_country",result="stale"} 1' in text
+    assert 'cache_hit_ratio{cache="news_country"} 0.5' in text
+
+
+def test_registry_exports_component_stats():
+    """Test registered stats are rendered as counters and gauges, skipping None."""
+    registry = MetricsRegistry()
+    registry.register_stats(
+        "scheduler", "Test scheduler", lambda: {"granted": 3, "queued": 1, "remaining_today": None},
+        counters=("granted",),
+    )
+
+    text = registry.render()
+    assert "# TYPE scheduler_granted_total counter" in text
+    assert "scheduler_granted_total 3" in text
+    assert "# TYPE scheduler_queued gauge" in text
+    assert "scheduler_queued 1" in text
+    assert "remaining_today" not in text
+
+
+def test_metrics_middleware_labels_route_templates():
+    """Test request latency is recorded per route template and status."""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(MetricsMiddleware(app))
+    labels = ("GET", "/items/{item_id}", 200)
+    before = REQUEST_DURATION.count(labels)
+    client.get("/items/1")
+    client.get("/items/2")
+    unmatched = REQUEST_DURATION.count(("GET", "<unmatched>", 404))
+    client.get("/missing")
+
+    assert REQUEST_DURATION.count(labels) == before + 2
+    assert REQUEST_DURATION.count(("GET", "<unmatched>", 404)) == unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_errors_are_counted_per_method():
+    """Test failed NewsAPI calls are counted by client method and error code."""
+    def handler(_request):
+        return httpx.Response(
+            401, json={"status": "error", "code": "apiKeyInvalid", "message": "API Error"}
+        )
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="https://newsapi.test/v2"
+    )
+    labels = ("get_all_news", "apiKeyInvalid")
+    before = UPSTREAM_ERRORS.value(labels)
+    assert await NewsAPI(client=client).get_all_news(search="test", page=1, limit=10) is None
+    assert UPSTREAM_ERRORS.value(labels) == before + 1
+
+
+def test_single_flight_counters_are_exported():
+    """Test the coalescing counters of the shared NewsAPI client reach /metrics."""
+    stats = news_api_client.single_flight.stats()
+
+    text = registry.render()
+    assert f"news_upstream_single_flight_calls_total {stats['calls']}" in text
+    assert f"news_upstream_single_flight_coalesced_total {stats['coalesced']}" in text
+    assert "# TYPE news_upstream_single_flight_in_flight gauge" in text
@@ -1,83 +1,74 @@
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
+import pytz
 import jwt
 from fastapi import Request, HTTPException
-
-from conf.middlewares import AuthenticationMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.testclient import TestClient
+
+from conf.middlewares import (
+    AuthenticationMiddleware,
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+)
 from conf.permissions import IsAuthenticated
-from conf.paginations import Pagination
+from conf.paginations import Pagination, CursorPagination
 from conf.vars import CLIENT_ID
+from models import Article
+
+
+async def _authenticated_state(headers: dict) -> bool:
+    """Run a request through the authentication middleware and read its state."""
+    scope = {
+        "type": "http",
+        "path": "/news",
+        "headers": [(key.encode(), value.encode()) for key, value in headers.items()],
+    }
+    calls = []
+
+    async def app(app_scope, _receive, _send):
+        calls.append(app_scope)
+
+    await AuthenticationMiddleware(app)(scope, None, None)
+    assert calls == [scope]
+    return Request(scope).state.is_authenticated
 
 
 @pytest.mark.asyncio
 @patch("jwt.decode")
 async def test_authentication_middleware(mock_jwt_decode):
     """Test the authentication middleware."""
-    middleware = AuthenticationMiddleware(app=None)
-
     # Configure mock to return valid payload
     mock_jwt_decode.return_value = {"sub": CLIENT_ID}
 
     # Test with valid token
-    mock_request = MagicMock(spec=Request)
-    mock_request.headers = {"authorization": "Bearer valid-token"}
-    mock_request.state = MagicMock()
-
-    async def mock_call_next(_):
-        return MagicMock()
+    assert await _authenticated_state({"authorization": "Bearer valid-token"}) is True
 
-    response = await middleware.dispatch(mock_request, mock_call_next)
-    assert response is not None
-    assert mock_request.state.is_authenticated is True
+    # Test with a token of another client
+    mock_jwt_decode.return_value = {"sub": "other-client"}
+    assert await _authenticated_state({"authorization": "Bearer valid-token"}) is False
 
     # Test with invalid token
     mock_jwt_decode.side_effect = jwt.InvalidTokenError()
-    mock_request.headers = {"authorization": "Bearer invalid-token"}
-    response = await middleware.dispatch(mock_request, mock_call_next)
-    assert response is not None
-    assert mock_request.state.is_authenticated is False
+    assert await _authenticated_state({"authorization": "Bearer invalid-token"}) is False
 
     # Test without token
-    mock_request.headers = {}
-    response = await middleware.dispatch(mock_request, mock_call_next)
-    assert response is not None
-    assert mock_request.state.is_authenticated is False
+    assert await _authenticated_state({}) is False
 
 
 @pytest.mark.asyncio
 async def test_authentication_middleware_with_expired_token():
     """Test the authentication middleware with an expired token."""
-    middleware = AuthenticationMiddleware(app=None)
-
-    mock_request = MagicMock(spec=Request)
-    mock_request.headers = {"authorization": "Bearer expired.token.here"}
-    mock_request.state = MagicMock()
-
-    async def mock_call_next(_):
-        return MagicMock()
-
     with patch("jwt.decode", side_effect=jwt.ExpiredSignatureError):
-        response = await middleware.dispatch(mock_request, mock_call_next)
-        assert response is not None
-        assert mock_request.state.is_authenticated is False
+        assert await _authenticated_state({"authorization": "Bearer expired.token.here"}) is False
 
 
 @pytest.mark.asyncio
 async def test_authentication_middleware_with_invalid_token_format():
     """Test the authentication middleware with invalid token format."""
-    middleware = AuthenticationMiddleware(app=None)
-
-    mock_request = MagicMock(spec=Request)
-    mock_request.headers = {"authorization": "InvalidFormat token"}
-    mock_request.state = MagicMock()
-
-    async def mock_call_next(_):
-        return MagicMock()
-
-    response = await middleware.dispatch(mock_request, mock_call_next)
-    assert response is not None
-    assert mock_request.state.is_authenticated is False
+    assert await _authenticated_state({"authorization": "InvalidFormat token"}) is False
 
 
 @pytest.mark.asyncio
@@ -99,6 +90,78 @@ async def test_is_authenticated_permission():
     assert "Authentication Failed" in exc.value.detail
 
 
+def test_conditional_get_middleware():
+    """Test a matching If-None-Match is answered with an empty 304."""
+    async def app(scope, receive, send):
+        response = Response(
+            content=b'{"data": []}',
+            media_type="application/json",
+            headers={"ETag": '"abc"', "Cache-Control": "private, max-age=60"},
+        )
+        await response(scope, receive, send)
+
+    client = TestClient(ConditionalGetMiddleware(app))
+
+    response = client.get("/", headers={"If-None-Match": 'W/"xyz", "abc"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers["cache-control"] == "private, max-age=60"
+
+    response = client.get("/", headers={"If-None-Match": '"xyz"'})
+    assert response.status_code == 200
+    assert response.content == b'{"data": []}'
+
+
+def test_compression_middleware_negotiates_and_caches():
+    """Test gzip is negotiated and a strong ETag body is compressed once."""
+    body = b'{"data": "' + b"news " * 200 + b'"}'
+
+    async def app(scope, receive, send):
+        response = Response(content=body, media_type="application/json", headers={"ETag": '"abc"'})
+        await response(scope, receive, send)
+
+    middleware = CompressionMiddleware(app, minimum_size=500)
+    client = TestClient(middleware)
+
+    for _ in range(2):
+        response = client.get("/", headers={"Accept-Encoding": "br;q=0, gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == '"abc-gzip"'
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == body
+    assert (middleware.cache_misses, middleware.cache_hits) == (1, 1)
+
+    for accept_encoding in ("identity", ""):
+        response = client.get("/", headers={"Accept-Encoding": accept_encoding})
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] == '"abc"'
+        assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_compression_middleware_skips_small_and_streams_large():
+    """Test small bodies are sent as is and streamed bodies are compressed per chunk."""
+    async def app(scope, receive, send):
+        if scope["path"] == "/small":
+            response = Response(content=b'{"data": 1}', media_type="application/json")
+        else:
+            response = StreamingResponse(
+                iter([b'{"line": 1}\n', b'{"line": 2}\n']), media_type="application/x-ndjson"
+            )
+        await response(scope, receive, send)
+
+    client = TestClient(CompressionMiddleware(app, minimum_size=500))
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == b'{"data": 1}'
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b'{"line": 1}\n{"line": 2}\n'
+
+
 def test_pagination():
     """Test the pagination functionality."""
     # Test with data
@@ -134,3 +197,56 @@ def test_pagination():
     assert paginated_data["prevPage"] is None
     assert paginated_data["pageCount"] == 0
     assert len(paginated_data["data"]) == 0
+
+
+def test_cursor_round_trip_and_tampering():
+    """Test cursors decode to what was encoded and reject tampering."""
+    published_at = datetime(2025, 4, 18, 12, 0, tzinfo=pytz.UTC)
+    cursor = CursorPagination.encode_cursor(published_at, 42)
+    assert CursorPagination.decode_cursor(cursor) == (published_at, 42, "next")
+
+    encoded, signature = cursor.split(".")
+    forged = CursorPagination.encode_cursor(published_at, 43).split(".")[0]
+    for bad_cursor in (f"{forged}.{signature}", "garbage", f"{encoded}.x"):
+        with pytest.raises(HTTPException) as exc:
+            CursorPagination.decode_cursor(bad_cursor)
+        assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_forward_and_back(test_db):
+    """Test keyset pages cover every dated row once, newest first, in both directions."""
+    start = datetime(2025, 4, 18, tzinfo=pytz.UTC)
+    for index in range(5):
+        await Article.create(title=f"Article {index}", published_at=start + timedelta(hours=index))
+    await Article.create(title="Same time", published_at=start + timedelta(hours=4))
+    await Article.create(title="Undated")
+
+    titles, cursor, pages = [], None, []
+    while True:
+        pagination = CursorPagination(limit=2, cursor=cursor)
+        rows = await pagination.paginate(Article.all(), "title")
+        pages.append(pagination.get_paginated_data())
+        titles.extend(row["title"] for row in rows)
+        cursor = pages[-1]["nextPage"]
+        if cursor is None:
+            break
+
+    assert titles == ["Same time", "Article 4", "Article 3", "Article 2", "Article 1", "Article 0"]
+    assert pages[0]["prevPage"] is None
+    assert set(pages[0]) == {
+        "totalCount", "page", "limit", "nextPage", "prevPage", "pageCount", "data"
+    }
+
+    pagination = CursorPagination(limit=2, cursor=pages[-1]["prevPage"])
+    rows = await pagination.paginate(Article.all(), "title")
+    assert [row["title"] for row in rows] == ["Article 3", "Article 2"]
+    assert pagination.get_paginated_data()["nextPage"] is not None
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_estimate_is_none_off_postgres(test_db):
+    """Test the planner estimate is only available on Postgres."""
+    assert await CursorPagination.estimate_total("article") is None
+    pagination = CursorPagination(limit=2, total_count=None)
+    assert pagination.get_paginated_data()["pageCount"] is None
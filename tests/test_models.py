@@ -2,7 +2,9 @@ from datetime import datetime
 
 import pytest
 import pytz
+from tortoise import Tortoise
 from tortoise.exceptions import ValidationError
+from tortoise.utils import get_schema_sql
 
 from models import Article
 
@@ -121,3 +123,20 @@ async def test_article_bulk_operations(test_db):
     # Test filtering
     count = await Article.filter(title__startswith="Bulk").count()
     assert count == 3
+
+
+def test_article_identity():
+    """Test article identity prefers the URL and is stable."""
+    by_url = Article.identity_for(url="https://test.com/a", title="A", published_at="2025")
+    assert by_url == Article.identity_for(url="https://test.com/a")
+    assert len(by_url) == 64
+
+    by_title = Article.identity_for(title="A", published_at="2025-04-18T12:00:00Z")
+    assert by_title != Article.identity_for(title="A", published_at="2025-04-19T12:00:00Z")
+
+
+@pytest.mark.asyncio
+async def test_article_keyset_index_is_descending(test_db):
+    """Test the generated keyset index matches the DESC index of the migration."""
+    schema = get_schema_sql(Tortoise.get_connection("default"), safe=True)
+    assert '"idx_article_published_at_id" ON "article" ("published_at" DESC, "id" DESC)' in schema
@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from conf.middlewares import ProfilingMiddleware
+from utils.profiler import ProfileStore, profile_store
+from utils.token import generate_access_token
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(range(1000))}
+
+    @app.get("/wait")
+    async def wait():
+        await asyncio.sleep(0.05)
+        return {}
+
+    return app
+
+
+def test_profiling_middleware_profiles_requests_with_the_token():
+    """Test a request with the profiling header is profiled and stored."""
+    profile_store.clear()
+    client = TestClient(ProfilingMiddleware(_app(), token="secret", sample_rate=0))
+
+    response = client.get("/work", headers={"X-Profile": "secret"})
+    profile = profile_store.get(int(response.headers["x-profile-id"]))
+
+    assert profile["path"] == "/work"
+    assert profile["status"] == 200
+    assert profile["top_functions"]
+    assert not profile_store.busy
+
+
+def test_profiling_middleware_reports_awaited_time_as_wait():
+    """Test time spent awaiting in the handler counts as wait, not CPU time."""
+    profile_store.clear()
+    client = TestClient(ProfilingMiddleware(_app(), token="secret", sample_rate=0))
+
+    response = client.get("/wait", headers={"X-Profile": "secret"})
+    profile = profile_store.get(int(response.headers["x-profile-id"]))
+
+    assert profile["wait_ms"] >= 40
+    assert profile["cpu_ms"] < profile["wait_ms"] <= profile["wall_ms"]
+
+
+def test_profiling_middleware_skips_unsampled_requests():
+    """Test requests without the token are not profiled at a zero sample rate."""
+    profile_store.clear()
+    client = TestClient(ProfilingMiddleware(_app(), token="secret", sample_rate=0))
+
+    assert "x-profile-id" not in client.get("/work").headers
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+    assert profile_store.list() == []
+
+
+def test_profile_store_is_a_ring_buffer():
+    """Test the oldest profiles are dropped and one profile runs at a time."""
+    store = ProfileStore(maxsize=2)
+    for path in ("/a", "/b", "/c"):
+        profile = store.start("GET", path)
+        assert store.start("GET", "/other") is None
+        with profile:
+            pass
+        store.finish(profile)
+
+    assert [profile["path"] for profile in store.list()] == ["/c", "/b"]
+    assert "top_functions" not in store.list()[0]
+    assert store.get(1) is None
+
+
+def test_admin_profiles_require_the_profile_token(test_app):
+    """Test a client token alone cannot read profiles, the profile token is required."""
+    headers = {"Authorization": f"Bearer {generate_access_token()}"}
+
+    assert test_app.get("/admin/profiles", headers=headers).status_code == 403
+    with patch("conf.permissions.PROFILE_TOKEN", "secret"):
+        assert test_app.get("/admin/profiles", headers=headers).status_code == 403
+        assert test_app.get(
+            "/admin/profiles", headers={**headers, "X-Profile": "wrong"}
+        ).status_code == 403
+        response = test_app.get("/admin/profiles", headers={**headers, "X-Profile": "secret"})
+        assert test_app.get("/admin/profiles", headers={"X-Profile": "secret"}).status_code == 401
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
@@ -1,4 +1,5 @@
 import json
+from datetime import datetime, timezone
 
 import pytest
 from pydantic import BaseModel, ValidationError
@@ -68,3 +69,28 @@ async def test_validation_error_handler():
         assert body["success"] is False
         assert "Validation Error" in body["message"]
         assert "detail" in body
+
+
+def test_custom_json_response_serializes_datetimes():
+    """Test datetimes in the payload are rendered as ISO 8601 strings."""
+    published_at = datetime(2025, 4, 18, 12, 30, tzinfo=timezone.utc)
+    response = CustomJSONResponse(content={"data": [{"published_at": published_at}], "page": 1})
+
+    body = json.loads(response.body)
+    assert body == {
+        "success": True,
+        "message": "Request Success",
+        "data": [{"published_at": "2025-04-18T12:30:00+00:00"}],
+        "page": 1,
+    }
+
+
+def test_custom_json_response_content_overrides_envelope():
+    """Test envelope keys in the content replace the defaults in place."""
+    response = CustomJSONResponse(
+        content={"message": "From content", "data": None, "detail": "x"}, status_code=400
+    )
+
+    assert list(json.loads(response.body).items()) == [
+        ("success", False), ("message", "From content"), ("data", None), ("detail", "x")
+    ]
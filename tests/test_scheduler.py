@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from utils.scheduler import Priority, QuotaExceeded, UpstreamScheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_enforces_daily_budget():
+    """Test calls beyond the daily budget are shed."""
+    scheduler = UpstreamScheduler(rate=100, burst=10, daily_budget=2)
+    await scheduler.acquire()
+    await scheduler.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire()
+    assert scheduler.stats()["remaining_today"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_sheds_background_work_when_budget_is_low():
+    """Test background calls are shed while interactive calls still pass."""
+    scheduler = UpstreamScheduler(rate=100, burst=10, daily_budget=10, background_reserve=0.5)
+    for _ in range(5):
+        await scheduler.acquire(Priority.BACKGROUND)
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire(Priority.BACKGROUND)
+    await scheduler.acquire(Priority.INTERACTIVE)
+    assert scheduler.shed == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_interactive_lane_first():
+    """Test queued interactive calls overtake queued background calls."""
+    scheduler = UpstreamScheduler(rate=50, burst=1)
+    await scheduler.acquire()
+    order = []
+
+    async def call(priority):
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    background = asyncio.ensure_future(call(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(call(Priority.INTERACTIVE))
+    await asyncio.gather(background, interactive)
+
+    assert order == [Priority.INTERACTIVE, Priority.BACKGROUND]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_sheds_calls_that_wait_too_long():
+    """Test a call that cannot get a token within its max wait is shed."""
+    scheduler = UpstreamScheduler(
+        rate=0.1, burst=1, max_wait={Priority.INTERACTIVE: 0.01, Priority.BACKGROUND: 0.01}
+    )
+    await scheduler.acquire()
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire()
+    assert scheduler.stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_back_off_sheds_background_and_delays_interactive():
+    """Test a back-off sheds background calls and holds interactive ones until it ends."""
+    scheduler = UpstreamScheduler(rate=100, burst=10)
+    scheduler.back_off(0.05)
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire(Priority.BACKGROUND)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await scheduler.acquire(Priority.INTERACTIVE)
+    assert loop.time() - started_at >= 0.04
+    await scheduler.acquire(Priority.BACKGROUND)
+    assert scheduler.stats()["remaining_today"] is None
+
+
+@pytest.mark.asyncio
+async def test_scheduler_sheds_interactive_calls_during_a_long_back_off():
+    """Test interactive calls are shed when the back-off outlasts their max wait."""
+    now = [0.0]
+    scheduler = UpstreamScheduler(rate=100, burst=10, backoff=60, timer=lambda: now[0])
+    scheduler.back_off()
+
+    with pytest.raises(QuotaExceeded):
+        await scheduler.acquire(Priority.INTERACTIVE)
+    now[0] = 61
+    await scheduler.acquire(Priority.INTERACTIVE)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_zero_rate_is_uncapped():
+    """Test a rate of 0 grants calls without pacing them."""
+    scheduler = UpstreamScheduler(rate=0, burst=1)
+    for _ in range(100):
+        await scheduler.acquire()
+    assert scheduler.granted == 100
@@ -1,81 +1,114 @@
-from unittest.mock import patch, MagicMock
+import asyncio
+import logging.handlers
+import queue
+import time
+from unittest.mock import MagicMock, patch
 from datetime import datetime
 from logging import LogRecord
 
+import httpx
+import jwt
 import pytest
 import pytz
-from newsapi.newsapi_exception import NewsAPIException
 
 from utils.news_api_client import NewsAPI
-from utils.log import Log
-from conf.log import LocalFormatter, LOGGING_CONFIG
+from utils.singleflight import SingleFlight
+from schemas import AllowedCountryCodes
+from utils.log import Log, LogThrottle, _route_through_queue, _write_due_summaries
+from utils.token import (
+    VerifiedTokenCache,
+    verified_tokens,
+    decode_access_token,
+    generate_access_token,
+)
+from conf.log import LocalFormatter, LOGGING_CONFIG, BoundedQueueHandler
+from conf.vars import CLIENT_ID
+
+
+def _news_api(handler):
+    """NewsAPI client whose upstream requests are answered by ``handler``."""
+    transport = httpx.MockTransport(handler)
+    client = httpx.AsyncClient(transport=transport, base_url="https://newsapi.test/v2")
+    return NewsAPI(client=client)
 
 
 @pytest.mark.asyncio
-async def test_get_all_news_success(mock_news_api_response):
+async def test_get_all_news_success(mock_newsapi_client, mock_news_api_response):
     """Test successful news retrieval."""
-    mock_client = MagicMock()
-    mock_client.get_everything.return_value = mock_news_api_response
-
-    news_api = NewsAPI()
-    news_api.client = mock_client
-    await news_api.get_all_news(search="test", page=1, limit=10)
+    result = await mock_newsapi_client.get_all_news(search="test", page=1, limit=10)
+    assert result == mock_news_api_response
 
     # Verify the API was called with correct parameters
-    mock_client.get_everything.assert_called_once_with(q="test", page=1, page_size=10)
+    request = mock_newsapi_client.requests[0]
+    assert request.url.path == "/v2/everything"
+    assert dict(request.url.params) == {"q": "test", "page": "1", "pageSize": "10"}
 
 
 @pytest.mark.asyncio
 async def test_get_all_news_failure():
     """Test news retrieval with API error."""
-    mock_client = MagicMock()
-    mock_client.get_everything.side_effect = NewsAPIException("API Error")
+    def handler(_request):
+        return httpx.Response(
+            401, json={"status": "error", "code": "apiKeyInvalid", "message": "API Error"}
+        )
 
-    news_api = NewsAPI()
-    news_api.client = mock_client
+    news_api = _news_api(handler)
     result = await news_api.get_all_news(search="test", page=1, limit=10)
     assert result is None
 
 
 @pytest.mark.asyncio
-async def test_get_top_three_headlines_success(mock_news_api_response):
-    """Test successful retrieval of top headlines."""
-    mock_client = MagicMock()
-    mock_client.get_top_headlines.return_value = mock_news_api_response
+async def test_get_all_news_transport_failure():
+    """Test news retrieval when the upstream cannot be reached."""
+    def handler(request):
+        raise httpx.ConnectTimeout("timed out", request=request)
 
-    news_api = NewsAPI()
-    news_api.client = mock_client
-    await news_api.get_top_three_headlines()
+    news_api = _news_api(handler)
+    result = await news_api.get_all_news(search="test", page=1, limit=10)
+    assert result is None
 
-    mock_client.get_top_headlines.assert_called_once_with(
-        country="us", page=1, page_size=5
-    )
+
+@pytest.mark.asyncio
+async def test_get_top_three_headlines_success(mock_newsapi_client):
+    """Test successful retrieval of top headlines."""
+    await mock_newsapi_client.get_top_three_headlines()
+
+    request = mock_newsapi_client.requests[0]
+    assert request.url.path == "/v2/top-headlines"
+    assert dict(request.url.params) == {"country": "us", "pageSize": "5", "page": "1"}
 
 
 @pytest.mark.asyncio
-async def test_get_headlines_by_country_success(mock_news_api_response):
+async def test_get_headlines_by_country_success(mock_newsapi_client, mock_news_api_response):
     """Test successful retrieval of headlines by country."""
-    mock_client = MagicMock()
-    mock_client.get_top_headlines.return_value = mock_news_api_response
-
-    news_api = NewsAPI()
-    news_api.client = mock_client
-    await news_api.get_headlines_by_country(country_code="us")
+    articles = await mock_newsapi_client.get_headlines_by_country(
+        country_code=AllowedCountryCodes.US
+    )
+    assert articles == mock_news_api_response["articles"]
 
-    mock_client.get_top_headlines.assert_called_once_with(country="us")
+    request = mock_newsapi_client.requests[0]
+    assert dict(request.url.params) == {"country": "us"}
 
 
 @pytest.mark.asyncio
-async def test_get_headlines_by_source_success(mock_news_api_response):
+async def test_get_headlines_by_source_success(mock_newsapi_client):
     """Test successful retrieval of headlines by source."""
-    mock_client = MagicMock()
-    mock_client.get_top_headlines.return_value = mock_news_api_response
+    await mock_newsapi_client.get_headlines_by_source(source_id="BBC News")
 
+    request = mock_newsapi_client.requests[0]
+    assert dict(request.url.params) == {"sources": "bbc-news"}
+
+
+@pytest.mark.asyncio
+async def test_news_api_reuses_pooled_client():
+    """Test the shared client is built once and rebuilt after close."""
     news_api = NewsAPI()
-    news_api.client = mock_client
-    await news_api.get_headlines_by_source(source_id="bbc-news")
+    client = news_api.client
+    assert news_api.client is client
 
-    mock_client.get_top_headlines.assert_called_once_with(sources="bbc-news")
+    await news_api.close()
+    assert news_api.client is not client
+    await news_api.close()
 
 
 @patch("utils.log.LOGGER")
@@ -151,6 +184,10 @@ def test_local_formatter():
     assert "{'key': 'value'}" in formatted
     assert datetime.now().strftime("%Y") in formatted
 
+    # Formatting again must not prefix the message twice
+    assert formatter.format(record) == formatted
+    assert record.msg == "Test message"
+
 
 @patch("utils.log.LOGGER")
 def test_log_method_info_capture(mock_logger):
@@ -169,6 +206,144 @@ def test_log_method_info_capture(mock_logger):
     assert __file__ in method_info["file_path"]
 
 
+@patch("utils.log.LOG_CALLER_INFO", False)
+@patch("utils.log.LOGGER")
+def test_log_without_caller_info(mock_logger):
+    """Test the caller lookup can be turned off."""
+    Log.warning("Test message")
+
+    _, kwargs = mock_logger.warning.call_args
+    assert kwargs["extra"]["method_info"] == {"file_path": None, "method": None}
+
+
+def test_bounded_queue_handler_drops_when_full():
+    """Test records beyond the queue size are dropped and counted."""
+    handler = BoundedQueueHandler(queue.Queue(1), overflow="drop")
+    logger = logging.getLogger("test_bounded_queue_handler")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    logger.warning("first")
+    logger.warning("second")
+
+    assert handler.queue.get_nowait().getMessage() == "first"
+    assert handler.dropped == 1
+
+
+def test_bounded_queue_handler_leaves_formatting_to_the_listener():
+    """Test records are queued with merged arguments and traceback text, but unformatted."""
+    handler = BoundedQueueHandler(queue.Queue(10))
+    handler.setFormatter(MagicMock())
+    logger = logging.getLogger("test_bounded_queue_handler_prepare")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logger.exception("failed %s", "request")
+
+    record = handler.queue.get_nowait()
+    handler.formatter.format.assert_not_called()
+    assert (record.msg, record.args, record.exc_info) == ("failed request", None, None)
+    assert "RuntimeError: boom" in record.exc_text
+    assert "RuntimeError: boom" in logging.Formatter().format(record)
+
+
+def test_bounded_queue_handler_rejects_unknown_overflow():
+    """Test an unknown overflow policy fails at configuration time."""
+    with pytest.raises(ValueError, match="LOG_QUEUE_OVERFLOW"):
+        BoundedQueueHandler(queue.Queue(1), overflow="wait")
+
+
+def test_queue_listener_flushes_on_stop():
+    """Test stopping the listener writes out every queued record."""
+    sink = logging.handlers.BufferingHandler(capacity=100)
+    logger = logging.getLogger("test_queue_listener_flushes")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(sink)
+
+    queue_handler, listener = _route_through_queue(logger, maxsize=10, overflow="block")
+    for index in range(5):
+        logger.info("record %s", index)
+    listener.stop()
+
+    assert logger.handlers == [queue_handler]
+    assert [record.getMessage() for record in sink.buffer] == [f"record {index}" for index in range(5)]
+
+
+def test_log_throttle_counts_repeats_per_window():
+    """Test repeats within a window are suppressed and reported when it closes."""
+    now = [0.0]
+    throttle = LogThrottle(window=60, maxsize=10, timer=lambda: now[0])
+    key = ("/news", "ExpiredSignatureError")
+
+    assert throttle.check(key) == (True, [])
+    assert throttle.check(key) == (False, [])
+    assert throttle.check(key) == (False, [])
+    assert throttle.check(("/news", "DecodeError"), "info") == (True, [])
+    now[0] = 61
+    assert throttle.check(key) == (True, [(key, 2, "warning")])
+    assert throttle.check(key) == (False, [])
+    assert throttle.drain() == [(key, 1, "warning")]
+
+
+def test_log_throttle_reports_closed_windows_and_evicted_keys():
+    """Test counts are reported once a window closes or its key is evicted, without a repeat."""
+    now = [0.0]
+    throttle = LogThrottle(window=60, maxsize=2, timer=lambda: now[0])
+    for key in ("a", "a", "b", "b", "b"):
+        throttle.check(key)
+    now[0] = 30
+    assert throttle.check("c") == (True, [("a", 1, "warning")])
+    throttle.check("c")
+
+    assert throttle.due() == []
+    now[0] = 61
+    assert throttle.due() == [("b", 2, "warning")]
+    now[0] = 91
+    assert throttle.due() == [("c", 1, "warning")]
+    assert throttle.check("b") == (True, [])
+
+
+def test_queue_listener_writes_due_summaries_on_a_timer():
+    """Test the listener thread writes summaries of closed windows while no records arrive."""
+    sink = logging.handlers.BufferingHandler(capacity=100)
+    logger = logging.getLogger("test_queue_listener_timer")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(sink)
+    throttle = LogThrottle(window=0.01, maxsize=10)
+
+    with patch("utils.log.throttle", throttle), patch("utils.log.LOGGER", logger):
+        _, listener = _route_through_queue(logger, maxsize=10, overflow="block",
+                                           on_timer=_write_due_summaries, interval=0.01)
+        for _ in range(3):
+            Log.warning("Authentication Failed", dedup_key=("/news", "AuthenticationFailed"))
+        deadline = time.monotonic() + 2
+        while len(sink.buffer) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        listener.stop()
+
+    assert [record.getMessage() for record in sink.buffer] == [
+        "Authentication Failed",
+        "Suppressed 2 repeated logs in 60s | key: ('/news', 'AuthenticationFailed')",
+    ]
+    assert sink.buffer[1].levelname == "WARNING"
+
+
+@patch("utils.log.throttle", LogThrottle(window=60, maxsize=10))
+@patch("utils.log.LOGGER")
+def test_log_deduplicates_by_key(mock_logger):
+    """Test repeated warnings with one dedup key are written once per window."""
+    for _ in range(3):
+        Log.warning("Authentication Failed", dedup_key=("/news", "AuthenticationFailed"))
+    Log.warning("Authentication Failed")
+
+    assert mock_logger.warning.call_count == 2
+
+
 def test_logging_config_structure():
     """Test the logging configuration structure."""
     assert "version" in LOGGING_CONFIG
@@ -182,3 +357,247 @@ def test_logging_config_structure():
     assert "stream_handler" in LOGGING_CONFIG["handlers"]
     assert "console" in LOGGING_CONFIG["handlers"]
     assert "local" in LOGGING_CONFIG["handlers"]
+
+
+@pytest.mark.asyncio
+async def test_headlines_are_served_from_cache(mock_newsapi_client):
+    """Test repeated headline lookups hit the upstream only once."""
+    first = await mock_newsapi_client.get_headlines_by_country(country_code="us")
+    second = await mock_newsapi_client.get_headlines_by_country(country_code=AllowedCountryCodes.US)
+
+    assert first == second
+    assert len(mock_newsapi_client.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_headlines_are_served_while_refreshing(mock_newsapi_client):
+    """Test an expired entry is returned immediately and refreshed in the background."""
+    cache = mock_newsapi_client.source_cache
+    await mock_newsapi_client.get_headlines_by_source(source_id="bbc-news")
+    key = next(iter(cache._entries))
+    payload, stored_at = cache._entries[key]
+    cache._entries[key] = ({**payload, "articles": ["stale"]}, stored_at - cache.ttl - 1)
+
+    articles = await mock_newsapi_client.get_headlines_by_source(source_id="bbc-news")
+    assert articles == ["stale"]
+
+    await cache._refreshing[key]
+    assert len(mock_newsapi_client.requests) == 2
+    assert cache.lookup(key)[0]["articles"] != ["stale"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_searches_are_coalesced(mock_news_api_response):
+    """Test concurrent identical searches share a single upstream call."""
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=mock_news_api_response)
+
+    news_api = _news_api(handler)
+    results = await asyncio.gather(
+        *(news_api.get_all_news(search="election", page=1, limit=10) for _ in range(5))
+    )
+
+    assert len(requests) == 1
+    assert all(result == mock_news_api_response for result in results)
+    assert news_api.single_flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_every_waiter():
+    """Test every coalesced caller receives the shared call's exception."""
+    single_flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", fetch) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert single_flight.calls == 1
+    assert single_flight.coalesced == 2
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_response_backs_off_for_retry_after():
+    """Test a rateLimited upstream error pauses calls for its Retry-After only."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(
+                429, headers={"Retry-After": "0.05"},
+                json={"status": "error", "code": "rateLimited", "message": "Too many requests"},
+            )
+        return httpx.Response(200, json={"status": "ok", "totalResults": 0, "articles": []})
+
+    news_api = _news_api(handler)
+    assert await news_api.get_all_news(search="first", page=1, limit=10) is None
+    assert news_api.scheduler.stats()["paused_seconds"] > 0
+    assert await news_api.get_all_news(search="second", page=1, limit=10) is not None
+
+    assert len(requests) == 2
+    assert news_api.scheduler.remaining_today is None
+
+
+@pytest.mark.asyncio
+async def test_get_all_news_splits_large_pages():
+    """Test a limit above the upstream page size is served from several pages."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        upstream_page = int(request.url.params["page"])
+        page_size = int(request.url.params["pageSize"])
+        articles = [
+            {"title": f"Article {(upstream_page - 1) * page_size + index}"}
+            for index in range(page_size)
+        ]
+        return httpx.Response(
+            200, json={"status": "ok", "totalResults": 1000, "articles": articles}
+        )
+
+    news_api = _news_api(handler)
+    news = await news_api.get_all_news(search="test", page=2, limit=150)
+
+    assert sorted(int(request.url.params["page"]) for request in requests) == [2, 3]
+    assert all(request.url.params["pageSize"] == "100" for request in requests)
+    assert news["totalResults"] == 1000
+    assert [article["title"] for article in news["articles"]] == [
+        f"Article {index}" for index in range(150, 300)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_all_news_requests_only_pages_with_results():
+    """Test pages beyond totalResults or the plan's result cap are not requested."""
+    requests = []
+    total_results = [12]
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "status": "ok", "totalResults": total_results[0],
+            "articles": [{"title": "Article"}] * min(total_results[0], 100),
+        })
+
+    news_api = _news_api(handler)
+    news = await news_api.get_all_news(search="test", page=1, limit=1000)
+
+    assert [request.url.params["page"] for request in requests] == ["1"]
+    assert news["totalResults"] == 12 and len(news["articles"]) == 12
+
+    requests.clear()
+    total_results[0] = 5000
+    with patch("utils.news_api_client.NEWS_API_MAX_RESULTS", 200):
+        news = await news_api.get_all_news(search="other", page=1, limit=1000)
+        assert await news_api.get_all_news(search="other", page=2, limit=1000) == {
+            "status": "ok", "totalResults": None, "articles": [],
+        }
+
+    assert sorted(request.url.params["page"] for request in requests) == ["1", "2"]
+    assert len(news["articles"]) == 200
+
+
+@pytest.mark.asyncio
+async def test_get_all_news_large_page_fails_if_any_page_fails():
+    """Test a failed upstream page fails the whole logical page."""
+    def handler(request):
+        if request.url.params["page"] == "2":
+            return httpx.Response(
+                500, json={"status": "error", "code": "unexpectedError", "message": "boom"}
+            )
+        return httpx.Response(
+            200, json={"status": "ok", "totalResults": 1000, "articles": []}
+        )
+
+    news_api = _news_api(handler)
+    assert await news_api.get_all_news(search="test", page=1, limit=250) is None
+
+
+@pytest.mark.asyncio
+async def test_iter_news_pages_walks_every_page():
+    """Test every upstream page is yielded until totalResults is reached."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        upstream_page = int(request.url.params["page"])
+        count = 100 if upstream_page < 3 else 50
+        articles = [{"title": f"{upstream_page}-{index}"} for index in range(count)]
+        return httpx.Response(
+            200, json={"status": "ok", "totalResults": 250, "articles": articles}
+        )
+
+    news_api = _news_api(handler)
+    pages = [articles async for articles in news_api.iter_news_pages(search="test")]
+
+    assert [len(articles) for articles in pages] == [100, 100, 50]
+    assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_iter_news_pages_stops_at_max_pages():
+    """Test no upstream page beyond max_pages is requested."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200, json={"status": "ok", "totalResults": 1000, "articles": [{"title": "x"}] * 100}
+        )
+
+    news_api = _news_api(handler)
+    pages = [articles async for articles in news_api.iter_news_pages(search="test", max_pages=2)]
+
+    assert len(pages) == 2
+    assert len(requests) == 2
+
+
+def test_verified_token_cache_evicts_at_expiry():
+    """Test cached claims are served until the token expires."""
+    now = [1000.0]
+    cache = VerifiedTokenCache(maxsize=2, timer=lambda: now[0])
+    cache.set("token", {"sub": "client", "exp": 1060})
+    cache.set("no-exp", {"sub": "client"})
+
+    assert cache.get("token") == {"sub": "client", "exp": 1060}
+    assert cache.get("no-exp") is None
+    now[0] = 1060
+    assert cache.get("token") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 0}
+
+
+def test_verified_token_cache_lru_eviction():
+    """Test the least recently used token is evicted first."""
+    cache = VerifiedTokenCache(maxsize=2, timer=lambda: 0)
+    for token in ("a", "b"):
+        cache.set(token, {"exp": 60})
+    cache.get("a")
+    cache.set("c", {"exp": 60})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
+
+
+def test_decode_access_token_verifies_once():
+    """Test a valid token is only verified on its first use."""
+    verified_tokens.clear()
+    token = generate_access_token()
+
+    with patch("jwt.decode", wraps=jwt.decode) as mock_decode:
+        assert decode_access_token(token)["sub"] == CLIENT_ID
+        assert decode_access_token(token)["sub"] == CLIENT_ID
+    assert mock_decode.call_count == 1
+
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_access_token("not-a-token")
@@ -1,10 +1,16 @@
+import asyncio
 import json
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 import pytest
+from newsapi.newsapi_exception import NewsAPIException
 
+from conf.vars import NEWS_CACHE_COUNTRY_TTL
 from views import (
+    _headlines_failure_response,
+    rendered_responses,
     get_news_view,
+    export_news_view,
     save_latest_news_view,
     get_headlines_by_country_view,
     get_headlines_by_source_view,
@@ -15,13 +21,10 @@ from models import Article
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
-async def test_get_news_view(mock_news_api_class, mock_news_api_response):
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_news_view(mock_api, mock_news_api_response):
     """Test the get_news_view function."""
-    # Create a mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_all_news.return_value = mock_news_api_response
-    mock_news_api_class.return_value = mock_api
 
     # Call the view
     response = await get_news_view(search="test", page=1, limit=10)
@@ -38,17 +41,14 @@ async def test_get_news_view(mock_news_api_class, mock_news_api_response):
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
+@patch("views.news_api_client", new_callable=AsyncMock)
 async def test_save_latest_news_view(
-    mock_news_api_class, mock_news_api_response, test_db
+    mock_api, mock_news_api_response, test_db
 ):
     """Test the save_latest_news_view function."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_top_three_headlines.return_value = mock_news_api_response["articles"][
         :3
     ]
-    mock_news_api_class.return_value = mock_api
 
     # Call the view
     response = await save_latest_news_view()
@@ -57,27 +57,30 @@ async def test_save_latest_news_view(
     # Parse and verify response
     body = json.loads(response.body)
     assert body["success"] is True
-    assert isinstance(body["data"], list)
-    assert len(body["data"]) <= 3
+    assert len(body["data"]["inserted"]) == 2
+    assert body["data"]["existing"] == []
 
     # Verify API was called
     mock_api.get_top_three_headlines.assert_awaited_once()
 
-    # Verify articles were saved
+    # Saving the same headlines again does not duplicate them
+    response = await save_latest_news_view()
+    body = json.loads(response.body)
+    assert body["data"]["inserted"] == []
+    assert len(body["data"]["existing"]) == 2
+
+    # Verify articles were saved once
     saved_articles = await Article.all()
-    assert len(saved_articles) > 0
+    assert len(saved_articles) == 2
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
+@patch("views.news_api_client", new_callable=AsyncMock)
 async def test_get_headlines_by_country_view(
-    mock_news_api_class, mock_news_api_response
+    mock_api, mock_news_api_response
 ):
     """Test the get_headlines_by_country_view function."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_headlines_by_country.return_value = mock_news_api_response["articles"]
-    mock_news_api_class.return_value = mock_api
 
     # Call the view
     response = await get_headlines_by_country_view(country_code=AllowedCountryCodes.US)
@@ -95,15 +98,12 @@ async def test_get_headlines_by_country_view(
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
+@patch("views.news_api_client", new_callable=AsyncMock)
 async def test_get_headlines_by_source_view(
-    mock_news_api_class, mock_news_api_response
+    mock_api, mock_news_api_response
 ):
     """Test the get_headlines_by_source_view function."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_headlines_by_source.return_value = mock_news_api_response["articles"]
-    mock_news_api_class.return_value = mock_api
 
     # Call the view
     response = await get_headlines_by_source_view(source_id="test-source")
@@ -119,16 +119,13 @@ async def test_get_headlines_by_source_view(
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
+@patch("views.news_api_client", new_callable=AsyncMock)
 async def test_get_headlines_by_filter_view(
-    mock_news_api_class, mock_news_api_response
+    mock_api, mock_news_api_response
 ):
     """Test the get_headlines_by_filter_view function."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_headlines_by_country.return_value = mock_news_api_response["articles"]
     mock_api.get_headlines_by_source.return_value = mock_news_api_response["articles"]
-    mock_news_api_class.return_value = mock_api
 
     # Test with both country and source
     response = await get_headlines_by_filter_view(
@@ -158,13 +155,10 @@ async def test_get_headlines_by_filter_view(
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
-async def test_get_news_view_failure(mock_news_api_class):
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_news_view_failure(mock_api):
     """Test the get_news_view function when API fails."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_all_news.return_value = None  # API returns None on failure
-    mock_news_api_class.return_value = mock_api
 
     response = await get_news_view(search="test", page=1, limit=10)
     assert response.status_code == 400  # Application returns 400 for API failures
@@ -173,13 +167,10 @@ async def test_get_news_view_failure(mock_news_api_class):
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
-async def test_save_latest_news_view_failure(mock_news_api_class, test_db):
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_save_latest_news_view_failure(mock_api, test_db):
     """Test the save_latest_news_view function when API fails."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_top_three_headlines.return_value = None  # API returns None on failure
-    mock_news_api_class.return_value = mock_api
 
     response = await save_latest_news_view()
     assert response.status_code == 400  # Application returns 400 for API failures
@@ -188,15 +179,159 @@ async def test_save_latest_news_view_failure(mock_news_api_class, test_db):
 
 
 @pytest.mark.asyncio
-@patch("views.NewsAPI")
-async def test_get_headlines_by_country_view_failure(mock_news_api_class):
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_headlines_by_country_view_failure(mock_api):
     """Test the get_headlines_by_country_view function when API fails."""
-    # Create mock API instance with async methods
-    mock_api = AsyncMock()
     mock_api.get_headlines_by_country.return_value = None  # API returns None on failure
-    mock_news_api_class.return_value = mock_api
+    mock_api.breaker.is_open = False
 
     response = await get_headlines_by_country_view(country_code=AllowedCountryCodes.US)
     assert response.status_code == 400  # Application returns 400 for API failures
     body = json.loads(response.body)
     assert "Failed to fetch" in body["message"]
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_headlines_view_serves_cached_headlines_when_circuit_open(
+    mock_api, mock_news_api_response
+):
+    """Test headlines fall back to the last cached payload while NewsAPI is down."""
+    mock_api.get_headlines_by_source.return_value = None
+    mock_api.breaker.is_open = True
+    mock_api.last_good_headlines = MagicMock(return_value=mock_news_api_response["articles"])
+
+    response = await get_headlines_by_source_view(source_id="bbc-news")
+    assert response.status_code == 200
+    assert response.headers["x-news-degraded"] == "true"
+    body = json.loads(response.body)
+    assert set(body) == {"success", "message", "data"}
+    assert body["data"] == mock_news_api_response["articles"]
+    mock_api.last_good_headlines.assert_called_once_with(country_code=None, source_id="bbc-news")
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_headlines_fall_back_to_stored_articles_only_for_us(mock_api, test_db):
+    """Test stored headlines back only the US endpoint while the circuit is open."""
+    await Article.create(title="Stored headline")
+    mock_api.breaker.is_open = True
+    mock_api.last_good_headlines = MagicMock(return_value=None)
+
+    response = await _headlines_failure_response(country_code=AllowedCountryCodes.US)
+    assert response.status_code == 200
+    assert response.headers["x-news-degraded"] == "true"
+    assert [article["title"] for article in json.loads(response.body)["data"]] == ["Stored headline"]
+
+    response = await _headlines_failure_response(country_code="gb")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_headlines_by_filter_view_intersects_results(mock_api):
+    """Test the combined filter matches country headlines on source id or URL."""
+    mock_api.get_headlines_by_country.return_value = [
+        {"source": {"id": "bbc-news"}, "url": "https://bbc.test/1"},
+        {"source": {"id": None, "name": "BBC"}, "url": "https://bbc.test/2"},
+        {"source": {"id": "cnn"}, "url": "https://cnn.test/1"},
+    ]
+    mock_api.get_headlines_by_source.return_value = [
+        {"source": {"id": "bbc-news"}, "url": "https://bbc.test/2"},
+        {"source": {"id": "bbc-news"}, "url": "https://bbc.test/3"},
+    ]
+
+    response = await get_headlines_by_filter_view(
+        country_code=AllowedCountryCodes.US, source_id="BBC News"
+    )
+    assert response.status_code == 200
+    body = json.loads(response.body)
+    assert [article["url"] for article in body["data"]] == [
+        "https://bbc.test/1",
+        "https://bbc.test/2",
+    ]
+    assert "country;dur=" in response.headers["server-timing"]
+    assert "source;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_get_headlines_by_filter_view_fetches_concurrently(mock_api):
+    """Test the country and source branches are in flight at the same time."""
+    source_started = asyncio.Event()
+
+    async def get_headlines_by_country(**_kwargs):
+        await asyncio.wait_for(source_started.wait(), timeout=1)
+        return []
+
+    async def get_headlines_by_source(**_kwargs):
+        source_started.set()
+        return []
+
+    mock_api.get_headlines_by_country.side_effect = get_headlines_by_country
+    mock_api.get_headlines_by_source.side_effect = get_headlines_by_source
+
+    response = await get_headlines_by_filter_view(
+        country_code=AllowedCountryCodes.US, source_id="bbc-news"
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client")
+async def test_export_news_view_streams_ndjson(mock_api, mock_news_api_response):
+    """Test the export view writes one JSON article per line across pages."""
+    closed = []
+
+    async def iter_news_pages(**_kwargs):
+        try:
+            yield mock_news_api_response["articles"]
+            yield mock_news_api_response["articles"][:1]
+        finally:
+            closed.append(True)
+
+    mock_api.iter_news_pages.side_effect = iter_news_pages
+
+    response = await export_news_view(search="test")
+    assert response.media_type == "application/x-ndjson"
+    lines = [line async for line in response.body_iterator]
+    articles = [json.loads(line) for line in "".join(lines).splitlines()]
+
+    assert [article["title"] for article in articles] == [
+        "Test Article 1", "Test Article 2", "Test Article 1"
+    ]
+    assert closed == [True]
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client")
+async def test_export_news_view_failure(mock_api):
+    """Test the export view answers 400 when the first page fails."""
+    async def iter_news_pages(**_kwargs):
+        raise NewsAPIException({"status": "error", "code": "x", "message": "boom"})
+        yield  # pragma: no cover
+
+    mock_api.iter_news_pages.side_effect = iter_news_pages
+
+    response = await export_news_view(search="test")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@patch("views.news_api_client", new_callable=AsyncMock)
+async def test_headlines_view_reuses_rendered_body(mock_api, mock_news_api_response):
+    """Test an unchanged cached payload is served from the rendered body cache."""
+    articles = mock_news_api_response["articles"]
+    mock_api.get_headlines_by_country.return_value = articles
+    rendered_responses.clear()
+
+    first = await get_headlines_by_country_view(country_code=AllowedCountryCodes.US)
+    second = await get_headlines_by_country_view(country_code=AllowedCountryCodes.US)
+    assert second.body is first.body
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["cache-control"] == f"private, max-age={int(NEWS_CACHE_COUNTRY_TTL)}"
+
+    mock_api.get_headlines_by_country.return_value = articles[:1]
+    third = await get_headlines_by_country_view(country_code=AllowedCountryCodes.US)
+    assert third.headers["etag"] != first.headers["etag"]
+    assert len(json.loads(third.body)["data"]) == 1
@@ -0,0 +1,120 @@
+import re
+from typing import List, Tuple
+
+from tortoise import Tortoise
+from tortoise.expressions import Q
+
+from conf.vars import ARTICLE_SEARCH_MODE
+from models import Article
+from utils.article_store import ARTICLE_FIELDS
+from utils.log import Log
+from utils.metrics import timed_db
+
+
+__all__ = ['ArticleSearch', 'article_search']
+
+
+# Relative weight of a term match per field, mirroring the A/B/C weights of
+# the ``search_vector`` column.
+FIELD_WEIGHTS = {"title": 1.0, "author": 0.4, "description": 0.2}
+
+POSTGRES_SEARCH_QUERY = """
+    SELECT "id", "identity", "title", "author", "description",
+           "published_at", "created_at", "updated_at",
+           ts_rank("search_vector", query) AS "rank", count(*) OVER () AS "total"
+    FROM "article", websearch_to_tsquery('english', $1) query
+    WHERE "search_vector" @@ query
+    ORDER BY "rank" DESC, "published_at" DESC NULLS LAST, "id" DESC
+    LIMIT $2 OFFSET $3
+"""
+
+SEARCH_VECTOR_COLUMN_QUERY = """
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'article' AND column_name = 'search_vector'
+"""
+
+POSTGRES_COUNT_QUERY = """
+    SELECT count(*) AS "total"
+    FROM "article"
+    WHERE "search_vector" @@ websearch_to_tsquery('english', $1)
+"""
+
+
+class ArticleSearch:
+    """Ranked full-text search over stored articles.
+
+    On Postgres the query runs against the GIN-indexed ``search_vector``
+    column (title, author and description) that migration 1 adds. Any other
+    database, such as the SQLite database used by the tests, and a Postgres
+    database built by ``generate_schemas`` without the migrations, uses the
+    local mode: candidate rows are matched with ``icontains`` and ranked in
+    Python with the same field weights. ``ARTICLE_SEARCH_MODE`` forces either mode.
+    """
+
+    def __init__(self, mode: str = ARTICLE_SEARCH_MODE):
+        self.mode = mode
+        # Whether the search_vector column exists, looked up once per process
+        self._has_search_vector = None
+
+    async def _use_postgres(self) -> bool:
+        if self.mode != "auto":
+            return self.mode == "postgres"
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect != "postgres":
+            return False
+        if self._has_search_vector is None:
+            rows = await connection.execute_query_dict(SEARCH_VECTOR_COLUMN_QUERY)
+            self._has_search_vector = bool(rows)
+            if not self._has_search_vector:
+                Log.warning(message='Article search falls back to local mode, '
+                                    'apply the migrations to add the search_vector column')
+        return self._has_search_vector
+
+    @timed_db("search_articles")
+    async def search(self, query: str, page: int, limit: int) -> Tuple[int, List[dict]]:
+        """Return the total match count and one page of ranked article rows."""
+        offset = (page - 1) * limit
+        if await self._use_postgres():
+            return await self._search_postgres(query, limit, offset)
+        return await self._search_local(query, limit, offset)
+
+    @staticmethod
+    async def _search_postgres(query: str, limit: int, offset: int) -> Tuple[int, List[dict]]:
+        connection = Tortoise.get_connection("default")
+        rows = await connection.execute_query_dict(POSTGRES_SEARCH_QUERY, [query, limit, offset])
+        if rows:
+            total = rows[0]["total"]
+        else:
+            total = (await connection.execute_query_dict(POSTGRES_COUNT_QUERY, [query]))[0]["total"]
+        for row in rows:
+            del row["total"]
+        return total, rows
+
+    @staticmethod
+    async def _search_local(query: str, limit: int, offset: int) -> Tuple[int, List[dict]]:
+        terms = [term for term in re.findall(r"\w+", query.lower()) if term]
+        if not terms:
+            return 0, []
+        condition = Q()
+        for term in terms:
+            for field in FIELD_WEIGHTS:
+                condition |= Q(**{f"{field}__icontains": term})
+        rows = await Article.filter(condition).values(*ARTICLE_FIELDS)
+        for row in rows:
+            row["rank"] = sum(
+                weight * (row[field] or "").lower().count(term)
+                for field, weight in FIELD_WEIGHTS.items()
+                for term in terms
+            )
+        rows.sort(
+            key=lambda row: (
+                row["rank"],
+                row["published_at"].timestamp() if row["published_at"] else float("-inf"),
+                row["id"],
+            ),
+            reverse=True,
+        )
+        return len(rows), rows[offset:offset + limit]
+
+
+article_search = ArticleSearch()
@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from tortoise import Tortoise
+from tortoise.queryset import QuerySet
+
+from models import Article
+from utils.metrics import timed_db
+
+
+__all__ = ['ARTICLE_FIELDS', 'save_articles', 'filter_articles', 'get_article']
+
+
+ARTICLE_FIELDS = (
+    "id", "identity", "title", "author", "description", "published_at", "created_at", "updated_at"
+)
+
+
+def _insert_new_sql(connection, articles: List[Article]) -> Tuple[str, list]:
+    """A multi-row ``INSERT ... ON CONFLICT ("identity") DO NOTHING RETURNING "identity"``."""
+    executor = connection.executor_class(model=Article, db=connection)
+    fields_map = Article._meta.fields_map
+    columns = executor.regular_columns
+    query = connection.query_class.into(Article._meta.basetable).columns(
+        *(Article._meta.fields_db_projection[column] for column in columns)
+    )
+    values = []
+    for article in articles:
+        offset = len(values)
+        query = query.insert(*(executor.parameter(offset + index) for index in range(len(columns))))
+        values.extend(
+            fields_map[column].to_db_value(getattr(article, column), article) for column in columns
+        )
+    # SQLite and Postgres both support RETURNING, only the Postgres query builder knows it
+    sql = query.on_conflict("identity").do_nothing().get_sql() + ' RETURNING "identity"'
+    return sql, values
+
+
+@timed_db("save_articles")
+async def save_articles(articles: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Store NewsAPI articles, skipping ones that are already stored.
+
+    Articles are keyed on ``Article.identity_for`` and written with a single
+    multi-row ``INSERT ... ON CONFLICT DO NOTHING RETURNING "identity"``, so
+    repeated or concurrent calls never duplicate rows and only the call that
+    wrote a row reports it as inserted. One more query reads the rows back.
+    Returns the ``(inserted, existing)`` rows in the order the articles were given.
+    """
+    candidates = {}
+    for article in articles:
+        identity = Article.identity_for(
+            url=article.get("url"),
+            title=article.get("title"),
+            published_at=article.get("publishedAt"),
+        )
+        candidates.setdefault(identity, Article(
+            identity=identity,
+            title=article.get("title"),
+            author=article.get("author"),
+            description=article.get("description"),
+            published_at=article.get("publishedAt"),
+        ))
+    if not candidates:
+        return [], []
+    connection = Tortoise.get_connection("default")
+    sql, values = _insert_new_sql(connection, list(candidates.values()))
+    inserted_identities = {
+        row["identity"] for row in await connection.execute_query_dict(sql, values)
+    }
+    rows = {
+        row["identity"]: row
+        for row in await Article.filter(identity__in=list(candidates)).values(*ARTICLE_FIELDS)
+    }
+    inserted, existing = [], []
+    for identity in candidates:
+        if identity in rows:
+            (inserted if identity in inserted_identities else existing).append(rows[identity])
+    return inserted, existing
+
+
+def filter_articles(author: str = None,
+                    published_from: datetime = None, published_to: datetime = None,
+                    created_from: datetime = None, created_to: datetime = None) -> QuerySet:
+    """Stored articles narrowed down by author and publication / creation windows.
+
+    Every filter maps onto an indexed column; date windows include their bounds.
+    """
+    filters = {
+        "author": author,
+        "published_at__gte": published_from,
+        "published_at__lte": published_to,
+        "created_at__gte": created_from,
+        "created_at__lte": created_to,
+    }
+    return Article.filter(**{key: value for key, value in filters.items() if value is not None})
+
+
+@timed_db("get_article")
+async def get_article(article_id: int) -> dict:
+    """A stored article row by id, or ``None``."""
+    return await Article.filter(id=article_id).first().values(*ARTICLE_FIELDS)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+from utils.log import Log
+
+
+__all__ = ['ResponseCache', 'MISSING', 'FRESH', 'STALE']
+
+
+MISSING = object()
+FRESH = "fresh"
+STALE = "stale"
+
+
+class ResponseCache:
+    """LRU cache with a time-to-live and a stale-while-revalidate window.
+
+    An entry younger than ``ttl`` is fresh. Up to ``ttl + stale_ttl`` it is
+    stale: it can still be served while a single background task refreshes it.
+    Older entries are treated as missing by ``lookup`` but stay available to
+    ``peek`` as a last known good value until evicted. ``maxsize`` bounds the
+    number of entries, evicting the least recently used one first.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0,
+                 timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def lookup(self, key: Hashable) -> Tuple[Any, str]:
+        """Return ``(value, FRESH | STALE)`` or ``(MISSING, None)``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING, None
+        value, stored_at = entry
+        age = self._timer() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            self.misses += 1
+            return MISSING, None
+        self._entries.move_to_end(key)
+        if age > self.ttl:
+            self.stale_hits += 1
+            return value, STALE
+        self.hits += 1
+        return value, FRESH
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the stored value regardless of its age, or ``MISSING``."""
+        entry = self._entries.get(key)
+        return MISSING if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        self._entries[key] = (value, self._timer())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Refresh ``key`` in the background, at most one task per key."""
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, fetch))
+            self._refreshing[key] = task
+        return task
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            self.set(key, await fetch())
+        except Exception as e:
+            Log.warning(message="Failed: Background cache refresh", data={"error": str(e)})
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> dict:
+        """Lookup counts by result."""
+        return {"hit": self.hits, "stale": self.stale_hits, "miss": self.misses}
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
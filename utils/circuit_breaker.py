@@ -0,0 +1,89 @@
+import time
+from typing import Callable, Optional
+
+from newsapi.newsapi_exception import NewsAPIException
+
+from utils.log import Log
+
+
+__all__ = ['CircuitBreaker', 'CircuitOpen']
+
+
+class CircuitOpen(NewsAPIException):
+    """Raised instead of calling an upstream that is known to be failing."""
+
+    def __init__(self):
+        super().__init__({
+            "status": "error",
+            "code": "circuitOpen",
+            "message": "NewsAPI is unavailable, skipping the call",
+        })
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast with ``CircuitOpen``. Once ``recovery_timeout`` seconds
+    have passed, up to ``half_open_max_calls`` trial calls are let through:
+    a success closes the circuit again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float,
+                 half_open_max_calls: int = 1, timer: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._timer = timer
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the upstream is currently considered unavailable."""
+        return self.state != self.CLOSED
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpen`` unless a call may be attempted now."""
+        if self.state == self.OPEN:
+            if self._timer() - self._opened_at < self.recovery_timeout:
+                raise CircuitOpen()
+            self.state = self.HALF_OPEN
+            self._trials = 0
+        if self.state == self.HALF_OPEN:
+            if self._trials >= self.half_open_max_calls:
+                raise CircuitOpen()
+            self._trials += 1
+
+    def record(self, healthy: Optional[bool]) -> None:
+        """Record the outcome of a call let through by ``before_call``.
+
+        ``None`` means the call never reached the upstream (e.g. it was shed or
+        cancelled) and only frees its half-open trial slot.
+        """
+        if self.state == self.HALF_OPEN:
+            self._trials = max(self._trials - 1, 0)
+        if healthy is None:
+            return
+        if healthy:
+            self._failures = 0
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                Log.info(message="NewsAPI circuit closed")
+            return
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self.state != self.OPEN:
+            Log.warning(message="NewsAPI circuit opened", data={"failures": self._failures})
+        self.state = self.OPEN
+        self._opened_at = self._timer()
+        self._trials = 0
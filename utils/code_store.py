@@ -0,0 +1,164 @@
+import asyncio
+import heapq
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from conf.vars import (
+    AUTH_CODE_BACKEND,
+    AUTH_CODE_TTL,
+    AUTH_CODE_MAXSIZE,
+    AUTH_CODE_SHARDS,
+    AUTH_CODE_SQLITE_PATH,
+)
+
+
+__all__ = ['MemoryCodeStore', 'SQLiteCodeStore', 'create_code_store', 'code_store']
+
+
+class _Shard:
+    """One shard of ``MemoryCodeStore``: codes plus a heap ordered by expiry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Tuple[str, float]] = {}
+        self.expiries: List[Tuple[float, str]] = []
+
+
+class MemoryCodeStore:
+    """Authorization codes of a single process, each mapped to the client it was issued to.
+
+    Codes are spread over ``shards`` shards, each with its own lock. Expiry is
+    driven by a heap per shard: a write or a lookup only pops the entries
+    that are due, it never scans the whole store. ``maxsize`` bounds the
+    entries over all shards; a full shard drops the code closest to expiry.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, shards: int = 16,
+                 timer: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._shard_maxsize = max(maxsize // shards, 1)
+        self._shards = [_Shard() for _ in range(shards)]
+        self._timer = timer
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def _shard(self, code: str) -> _Shard:
+        return self._shards[hash(code) % len(self._shards)]
+
+    @staticmethod
+    def _purge(shard: _Shard, now: float) -> None:
+        expiries = shard.expiries
+        while expiries and expiries[0][0] <= now:
+            expires_at, code = heapq.heappop(expiries)
+            entry = shard.entries.get(code)
+            # A code stored again keeps its old heap item, only drop the live one
+            if entry is not None and entry[1] == expires_at:
+                del shard.entries[code]
+
+    async def put(self, code: str, client_id: str) -> None:
+        """Store ``code`` as issued to ``client_id``."""
+        shard = self._shard(code)
+        now = self._timer()
+        with shard.lock:
+            self._purge(shard, now)
+            while len(shard.entries) >= self._shard_maxsize and code not in shard.entries:
+                self._purge(shard, shard.expiries[0][0])
+            expires_at = now + self.ttl
+            shard.entries[code] = (client_id, expires_at)
+            heapq.heappush(shard.expiries, (expires_at, code))
+            if len(shard.expiries) > 2 * len(shard.entries) + 64:
+                shard.expiries = [(expiry, live_code) for live_code, (_, expiry) in shard.entries.items()]
+                heapq.heapify(shard.expiries)
+
+    async def pop(self, code: str) -> Optional[str]:
+        """Remove a live ``code`` and return the client it was issued to, or ``None``."""
+        shard = self._shard(code)
+        with shard.lock:
+            self._purge(shard, self._timer())
+            entry = shard.entries.pop(code, None)
+        return entry[0] if entry else None
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteCodeStore:
+    """Authorization codes in a SQLite file shared by every worker process.
+
+    ``pop`` is a single ``DELETE ... RETURNING`` statement, so a code is
+    handed out once even when two workers race for it. Expired rows are
+    deleted through the ``expires_at`` index, at most once per
+    ``purge_interval`` seconds per process. Queries run in a worker thread to
+    keep the event loop free while SQLite waits on a lock.
+    """
+
+    def __init__(self, path: str, ttl: float, purge_interval: float = 30,
+                 timer: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._timer = timer
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS auth_code "
+            "(code TEXT PRIMARY KEY, client_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_auth_code_expires_at ON auth_code (expires_at)"
+        )
+
+    def _execute(self, query: str, parameters: tuple) -> list:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def _put(self, code: str, client_id: str) -> None:
+        now = self._timer()
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self._execute("DELETE FROM auth_code WHERE expires_at <= ?", (now,))
+        self._execute(
+            "INSERT INTO auth_code (code, client_id, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (code) DO UPDATE SET "
+            "client_id = excluded.client_id, expires_at = excluded.expires_at",
+            (code, client_id, now + self.ttl),
+        )
+
+    def _pop(self, code: str) -> Optional[str]:
+        rows = self._execute(
+            "DELETE FROM auth_code WHERE code = ? RETURNING client_id, expires_at", (code,)
+        )
+        if rows and rows[0][1] > self._timer():
+            return rows[0][0]
+        return None
+
+    async def put(self, code: str, client_id: str) -> None:
+        """Store ``code`` as issued to ``client_id``."""
+        await asyncio.to_thread(self._put, code, client_id)
+
+    async def pop(self, code: str) -> Optional[str]:
+        """Remove a live ``code`` and return the client it was issued to, or ``None``."""
+        return await asyncio.to_thread(self._pop, code)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def create_code_store(backend: str = AUTH_CODE_BACKEND):
+    """The code store selected by ``AUTH_CODE_BACKEND``."""
+    if backend == "sqlite":
+        return SQLiteCodeStore(AUTH_CODE_SQLITE_PATH, ttl=AUTH_CODE_TTL)
+    if backend == "memory":
+        return MemoryCodeStore(ttl=AUTH_CODE_TTL, maxsize=AUTH_CODE_MAXSIZE, shards=AUTH_CODE_SHARDS)
+    raise ValueError(f"Unknown AUTH_CODE_BACKEND: {backend}")
+
+
+code_store = create_code_store()
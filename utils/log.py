@@ -1,57 +1,262 @@
-import inspect
+import atexit
 import logging.config
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueListener
+from typing import Callable, Hashable, List, Tuple
 
-from conf.log import LOGGING_CONFIG
-from conf.vars import LOGGER_TO_USE
+from conf.log import LOGGING_CONFIG, BoundedQueueHandler
+from conf.vars import (
+    LOGGER_TO_USE,
+    LOG_CALLER_INFO,
+    LOG_QUEUE_SIZE,
+    LOG_QUEUE_OVERFLOW,
+    LOG_DEDUP_WINDOW,
+    LOG_DEDUP_MAXSIZE,
+    LOG_DEDUP_FLUSH_INTERVAL,
+)
 
 
-__all__ = ['Log']
+__all__ = ['Log', 'LogThrottle', 'shutdown_logging']
+
+
+# (key, repeats suppressed in its window, level of the log that opened the window)
+Summary = Tuple[Hashable, int, str]
+
+
+class LogThrottle:
+    """Let one log per key through per ``window`` seconds and count the rest.
+
+    The first call for a key opens a window and is logged; repeats within
+    the window are suppressed. Once a window has closed, its count is handed
+    out as a summary by ``due``, or by the next call for the key if that
+    comes first. At most ``maxsize`` keys are tracked; the key with the
+    oldest window is dropped first and its count handed out right away.
+    """
+
+    def __init__(self, window: float, maxsize: int, timer: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.maxsize = maxsize
+        self._timer = timer
+        # Ordered by when the window of each key opened
+        self._keys: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: Hashable, level: str = 'warning') -> Tuple[bool, List[Summary]]:
+        """``(log it, summaries to write first)`` for a call logged at ``level``.
+
+        The summaries are those of the window of ``key`` that just closed and
+        of keys evicted to make room for it.
+        """
+        now = self._timer()
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False, []
+            summaries = []
+            if entry is not None and entry[1]:
+                summaries.append((key, entry[1], entry[2]))
+            self._keys[key] = [now, 0, level]
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                evicted, (_, suppressed, evicted_level) = self._keys.popitem(last=False)
+                if suppressed:
+                    summaries.append((evicted, suppressed, evicted_level))
+            return True, summaries
+
+    def due(self) -> List[Summary]:
+        """Summaries of the windows that have closed, forgetting their keys."""
+        now = self._timer()
+        summaries = []
+        with self._lock:
+            while self._keys:
+                key, entry = next(iter(self._keys.items()))
+                if now - entry[0] < self.window:
+                    break
+                del self._keys[key]
+                if entry[1]:
+                    summaries.append((key, entry[1], entry[2]))
+        return summaries
+
+    def drain(self) -> List[Summary]:
+        """Summaries of every key with suppressed repeats, resetting every window."""
+        with self._lock:
+            pending = [(key, entry[1], entry[2]) for key, entry in self._keys.items() if entry[1]]
+            self._keys.clear()
+        return pending
+
+
+throttle = LogThrottle(window=LOG_DEDUP_WINDOW, maxsize=LOG_DEDUP_MAXSIZE)
+
+NO_CALLER_INFO = {'file_path': None, 'method': None}
+
+
+def _suppressed_message(key: Hashable, count: int) -> str:
+    return f'Suppressed {count} repeated logs in {LOG_DEDUP_WINDOW:g}s | key: {key}'
+
+
+class _TimedQueueListener(QueueListener):
+    """``QueueListener`` that also calls ``on_timer(listener)`` every ``interval`` seconds.
+
+    The call happens on the listener thread, also while no records arrive.
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers, on_timer: Callable = None,
+                 interval: float = 0, respect_handler_level: bool = False):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.on_timer = on_timer
+        self.interval = interval
+        self._next_run = time.monotonic() + interval
+
+    def dequeue(self, block: bool):
+        if self.on_timer is None or self.interval <= 0:
+            return super().dequeue(block)
+        while True:
+            timeout = self._next_run - time.monotonic()
+            if timeout <= 0:
+                self._next_run = time.monotonic() + self.interval
+                self.on_timer(self)
+                continue
+            try:
+                return self.queue.get(block, timeout)
+            except queue.Empty:
+                pass
+
+
+def _write_due_summaries(listener: QueueListener) -> None:
+    """Hand the summaries of closed dedup windows straight to the listener's handlers."""
+    for key, count, level in throttle.due():
+        levelno = getattr(logging, level.upper())
+        if LOGGER.isEnabledFor(levelno):
+            listener.handle(LOGGER.makeRecord(
+                LOGGER.name, levelno, __file__, 0, _suppressed_message(key, count), None, None,
+                extra={'data': {'suppressed': count}, 'method_info': NO_CALLER_INFO},
+            ))
+
+
+def _route_through_queue(logger: logging.Logger, maxsize: int, overflow: str,
+                         on_timer: Callable = None, interval: float = 0):
+    """Put the handlers of ``logger`` behind a bounded queue drained by a listener thread.
+
+    Request code then only enqueues records; formatting and I/O happen on the
+    listener thread, which also runs ``on_timer`` every ``interval`` seconds.
+    """
+    handlers = logger.handlers[:]
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize), overflow=overflow)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    listener = _TimedQueueListener(queue_handler.queue, *handlers, on_timer=on_timer,
+                                   interval=interval, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
 
 
 logging.config.dictConfig(LOGGING_CONFIG)
 LOGGER = logging.getLogger(LOGGER_TO_USE)
+QUEUE_HANDLER, _listener = None, None
+if LOG_QUEUE_SIZE > 0:
+    QUEUE_HANDLER, _listener = _route_through_queue(
+        LOGGER, LOG_QUEUE_SIZE, LOG_QUEUE_OVERFLOW,
+        on_timer=_write_due_summaries, interval=LOG_DEDUP_FLUSH_INTERVAL,
+    )
+
+
+def shutdown_logging() -> None:
+    """Write out every queued record and stop the listener thread.
+
+    Records logged afterwards go straight to the handlers again.
+    """
+    global _listener
+    for key, count, level in throttle.drain():
+        getattr(LOGGER, level)(_suppressed_message(key, count))
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    LOGGER.removeHandler(QUEUE_HANDLER)
+    for handler in listener.handlers:
+        LOGGER.addHandler(handler)
+    if QUEUE_HANDLER.dropped:
+        LOGGER.warning(f"Dropped {QUEUE_HANDLER.dropped} log records, the log queue was full")
+
+
+atexit.register(shutdown_logging)
+
+# Caller file path and function name per code object
+_callers = {}
+
+
+def _caller_info(depth: int = 2) -> dict:
+    """``method_info`` of the frame ``depth`` levels above this one.
+
+    Reads the code object of that frame instead of building the whole stack
+    with ``inspect.stack()``; ``LOG_CALLER_INFO`` turns the lookup off.
+    """
+    if not LOG_CALLER_INFO:
+        return NO_CALLER_INFO
+    code = sys._getframe(depth).f_code
+    method_info = _callers.get(code)
+    if method_info is None:
+        method_info = _callers[code] = {'file_path': code.co_filename, 'method': code.co_name}
+    return method_info
 
 
 class Log:
+    """Application logger.
+
+    Every method takes an optional ``dedup_key`` (e.g. path and error type):
+    repeated logs with the same key are collapsed to one line per
+    ``LOG_DEDUP_WINDOW`` followed by a count of the suppressed ones.
+    """
+
     @staticmethod
-    def _send_log(log_level: str, **kwargs) -> None:
+    def _send_log(log_level: str, message: str, data: dict, method_info: dict) -> None:
         _logger = getattr(LOGGER, log_level)
 
-        _logger(kwargs.get('message'), extra={
-            'data': kwargs.get('data'),
-            'method_info': {'file_path': kwargs.get('file_path'), 'method': kwargs.get('method')}
-        })
+        _logger(message, extra={'data': data, 'method_info': method_info})
         return
 
     @classmethod
-    def info(cls, message: str,  data: dict = None):
-        _inspect = inspect.stack()
-        file_path = _inspect[1].filename
-        method = _inspect[1].function
+    def _admit(cls, log_level: str, dedup_key: Hashable) -> bool:
+        """Whether a deduplicated log is written, writing the summaries of closed windows first."""
+        if dedup_key is None or LOG_DEDUP_WINDOW <= 0:
+            return True
+        log_it, summaries = throttle.check(dedup_key, log_level)
+        for key, suppressed, level in summaries:
+            cls._send_log(log_level=level,
+                          message=_suppressed_message(key, suppressed),
+                          data={'suppressed': suppressed},
+                          method_info=NO_CALLER_INFO)
+        return log_it
+
+    @classmethod
+    def info(cls, message: str,  data: dict = None, dedup_key: Hashable = None):
+        if not cls._admit('info', dedup_key):
+            return
         cls._send_log(log_level='info',
                       message=message,
                       data=data,
-                      file_path=file_path,
-                      method=method)
+                      method_info=_caller_info())
 
     @classmethod
-    def warning(cls, message: str, data: dict = None):
-        _inspect = inspect.stack()
-        file_path = _inspect[1].filename
-        method = _inspect[1].function
+    def warning(cls, message: str, data: dict = None, dedup_key: Hashable = None):
+        if not cls._admit('warning', dedup_key):
+            return
         cls._send_log(log_level='warning',
                       message=message,
                       data=data,
-                      file_path=file_path,
-                      method=method)
+                      method_info=_caller_info())
 
     @classmethod
-    def error(cls, message: str, data: dict = None):
-        _inspect = inspect.stack()
-        file_path = _inspect[1].filename
-        method = _inspect[1].function
+    def error(cls, message: str, data: dict = None, dedup_key: Hashable = None):
+        if not cls._admit('error', dedup_key):
+            return
         cls._send_log(log_level='error',
                       message=message,
                       data=data,
-                      file_path=file_path,
-                      method=method)
+                      method_info=_caller_info())
@@ -0,0 +1,207 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+__all__ = [
+    'Counter', 'Histogram', 'MetricsRegistry', 'registry', 'timed_db',
+    'REQUEST_DURATION', 'UPSTREAM_DURATION', 'UPSTREAM_ERRORS', 'DB_DURATION', 'RENDER_DURATION',
+]
+
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter per label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        """Add ``amount`` to the series of ``labels``."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Latency histogram per label values.
+
+    ``observe`` costs a bisect and three increments on plain lists; the
+    cumulative bucket counts are only computed when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        """Record one observation of ``value`` seconds."""
+        series = self._series.get(labels)
+        if series is None:
+            # One count per bucket plus +Inf, then the sum of the observations
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, labels: Tuple = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Metrics of the process, rendered in the Prometheus text format.
+
+    Recording is plain dict and list arithmetic on the event loop thread, no
+    locks are taken. Cache and component statistics are not recorded on the
+    hot path at all: registered ``stats`` callables are read when ``/metrics``
+    is scraped.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._caches: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._stats: Dict[str, tuple] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, int]]) -> None:
+        """Export the counts returned by ``stats`` (e.g. ``{"hit": 3, "miss": 1}``) for a cache.
+
+        Registering a name again replaces the previous cache.
+        """
+        self._caches[name] = stats
+
+    def register_stats(self, prefix: str, documentation: str,
+                       stats: Callable[[], Dict[str, Optional[float]]],
+                       counters: Tuple[str, ...] = ()) -> None:
+        """Export every value returned by ``stats`` as ``<prefix>_<key>``.
+
+        Keys listed in ``counters`` are rendered as counters (``_total``), the
+        others as gauges; ``None`` values are left out. Registering a prefix
+        again replaces the previous callable.
+        """
+        self._stats[prefix] = (documentation, stats, counters)
+
+    def _stats_samples(self) -> Iterable[str]:
+        for prefix, (documentation, stats, counters) in list(self._stats.items()):
+            for key, value in stats().items():
+                if value is None:
+                    continue
+                kind = "counter" if key in counters else "gauge"
+                name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+                yield f"# HELP {name} {documentation}: {key}."
+                yield f"# TYPE {name} {kind}"
+                yield f"{name} {_number(value)}"
+
+    def _cache_samples(self) -> Iterable[str]:
+        yield "# HELP cache_requests_total Cache lookups by result."
+        yield "# TYPE cache_requests_total counter"
+        ratios = []
+        for cache, stats in list(self._caches.items()):
+            counts = stats()
+            for result, count in counts.items():
+                yield f'cache_requests_total{{cache="{_escape(cache)}",result="{_escape(result)}"}} {count}'
+            total = sum(counts.values())
+            ratios.append((cache, (total - counts.get("miss", 0)) / total if total else 0.0))
+        yield "# HELP cache_hit_ratio Share of cache lookups served from the cache."
+        yield "# TYPE cache_hit_ratio gauge"
+        for cache, ratio in ratios:
+            yield f'cache_hit_ratio{{cache="{_escape(cache)}"}} {_number(ratio)}'
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        lines.extend(self._cache_samples())
+        lines.extend(self._stats_samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route and status.",
+    ("method", "route", "status"),
+)
+UPSTREAM_DURATION = registry.histogram(
+    "news_upstream_request_duration_seconds", "NewsAPI call latency by client method and outcome.",
+    ("method", "outcome"),
+)
+UPSTREAM_ERRORS = registry.counter(
+    "news_upstream_errors_total", "Failed NewsAPI calls by client method and error code.",
+    ("method", "code"),
+)
+DB_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Database query latency by operation.", ("operation",),
+)
+RENDER_DURATION = registry.histogram(
+    "response_render_duration_seconds", "JSON rendering time of API responses.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+
+
+def timed_db(operation: str):
+    """Decorator recording the duration of an async database operation."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                DB_DURATION.observe((operation,), time.perf_counter() - started_at)
+        return wrapper
+    return decorator
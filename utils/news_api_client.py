@@ -1,22 +1,269 @@
-from newsapi import NewsApiClient
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
 from newsapi.newsapi_exception import NewsAPIException
 
-from conf.vars import NEWS_API_KEY
+from conf.vars import (
+    NEWS_API_KEY,
+    NEWS_API_BASE_URL,
+    NEWS_API_TIMEOUT,
+    NEWS_API_CONNECT_TIMEOUT,
+    NEWS_API_MAX_CONNECTIONS,
+    NEWS_API_MAX_KEEPALIVE_CONNECTIONS,
+    NEWS_API_KEEPALIVE_EXPIRY,
+    NEWS_API_MAX_PAGE_SIZE,
+    NEWS_API_PAGE_CONCURRENCY,
+    NEWS_API_MAX_RESULTS,
+    NEWS_API_RATE,
+    NEWS_API_BURST,
+    NEWS_API_DAILY_BUDGET,
+    NEWS_API_BACKGROUND_RESERVE,
+    NEWS_API_INTERACTIVE_MAX_WAIT,
+    NEWS_API_BACKGROUND_MAX_WAIT,
+    NEWS_API_RATE_LIMIT_BACKOFF,
+    NEWS_API_BREAKER_FAILURE_THRESHOLD,
+    NEWS_API_BREAKER_RECOVERY_TIMEOUT,
+    NEWS_API_BREAKER_HALF_OPEN_CALLS,
+    NEWS_CACHE_COUNTRY_TTL,
+    NEWS_CACHE_COUNTRY_MAXSIZE,
+    NEWS_CACHE_SOURCE_TTL,
+    NEWS_CACHE_SOURCE_MAXSIZE,
+    NEWS_CACHE_SEARCH_TTL,
+    NEWS_CACHE_SEARCH_MAXSIZE,
+    NEWS_CACHE_STALE_TTL,
+)
+from utils.cache import ResponseCache, MISSING, FRESH, STALE
+from utils.circuit_breaker import CircuitBreaker
 from utils.log import Log
+from utils.metrics import registry, UPSTREAM_DURATION, UPSTREAM_ERRORS
+from utils.scheduler import Priority, UpstreamScheduler
+from utils.singleflight import SingleFlight
+
+
+def _canonical_params(params: dict) -> dict:
+    """Normalise query parameters; enum members (e.g. AllowedCountryCodes) are sent by value."""
+    return {key: getattr(value, "value", value) for key, value in params.items()}
+
+
+def _request_key(endpoint: str, params: dict) -> tuple:
+    """Canonical key identifying an upstream request."""
+    return endpoint, tuple(sorted(params.items()))
+
+
+def _retry_after(response: httpx.Response):
+    """Seconds asked for by a ``Retry-After`` header (delay or HTTP date), or ``None``."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
 
 
 class NewsAPI:
-    """A client class for interacting with the News API."""
+    """A client class for interacting with the News API.
+
+    Requests are made through a non-blocking ``httpx.AsyncClient`` whose
+    connection pool is kept alive for as long as the instance lives, so one
+    instance should be shared by the whole process (see ``news_api_client``).
+
+    Headline and search responses are kept in per-endpoint ``ResponseCache``s;
+    expired entries are served stale while one background task refreshes them.
+    Identical requests in flight at the same time share one upstream call, and
+    every call is paced by an ``UpstreamScheduler`` that keeps us inside the
+    plan's rate and daily budget, serving interactive requests first. A
+    ``CircuitBreaker`` makes calls fail fast while the upstream is unhealthy.
+    """
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        self._client = client
+        self.country_cache = ResponseCache(
+            maxsize=NEWS_CACHE_COUNTRY_MAXSIZE,
+            ttl=NEWS_CACHE_COUNTRY_TTL,
+            stale_ttl=NEWS_CACHE_STALE_TTL,
+        )
+        self.source_cache = ResponseCache(
+            maxsize=NEWS_CACHE_SOURCE_MAXSIZE,
+            ttl=NEWS_CACHE_SOURCE_TTL,
+            stale_ttl=NEWS_CACHE_STALE_TTL,
+        )
+        self.search_cache = ResponseCache(
+            maxsize=NEWS_CACHE_SEARCH_MAXSIZE,
+            ttl=NEWS_CACHE_SEARCH_TTL,
+            stale_ttl=NEWS_CACHE_STALE_TTL,
+        )
+        self.single_flight = SingleFlight()
+        self.scheduler = UpstreamScheduler(
+            rate=NEWS_API_RATE,
+            burst=NEWS_API_BURST,
+            daily_budget=NEWS_API_DAILY_BUDGET,
+            background_reserve=NEWS_API_BACKGROUND_RESERVE,
+            max_wait={
+                Priority.INTERACTIVE: NEWS_API_INTERACTIVE_MAX_WAIT,
+                Priority.BACKGROUND: NEWS_API_BACKGROUND_MAX_WAIT,
+            },
+            backoff=NEWS_API_RATE_LIMIT_BACKOFF,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=NEWS_API_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=NEWS_API_BREAKER_RECOVERY_TIMEOUT,
+            half_open_max_calls=NEWS_API_BREAKER_HALF_OPEN_CALLS,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created lazily on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=NEWS_API_BASE_URL,
+                headers={"X-Api-Key": NEWS_API_KEY or ""},
+                limits=httpx.Limits(
+                    max_connections=NEWS_API_MAX_CONNECTIONS,
+                    max_keepalive_connections=NEWS_API_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=NEWS_API_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    NEWS_API_TIMEOUT, connect=NEWS_API_CONNECT_TIMEOUT
+                ),
+            )
+        return self._client
+
+    @client.setter
+    def client(self, client: httpx.AsyncClient):
+        self._client = client
+
+    async def close(self):
+        """Close the pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _get(self, method: str, endpoint: str, priority: Priority = Priority.INTERACTIVE,
+                   **params) -> dict:
+        """Send a GET request to a News API endpoint and return the payload.
+
+        ``method`` names the client method making the call and labels its
+        metrics. Concurrent calls with the same endpoint and parameters are
+        coalesced into one request. Transport failures, error payloads and
+        calls shed by the scheduler are all raised as ``NewsAPIException`` so
+        callers only have one failure mode to handle.
+        """
+        params = _canonical_params(params)
+        return await self.single_flight.do(
+            _request_key(endpoint, params),
+            lambda: self._request(method, endpoint, params, priority),
+        )
+
+    async def _request(self, method: str, endpoint: str, params: dict,
+                       priority: Priority) -> dict:
+        self.breaker.before_call()
+        healthy = None
+        try:
+            await self.scheduler.acquire(priority)
+            started_at = time.perf_counter()
+            try:
+                response = await self.client.get(endpoint, params=params)
+                payload = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                healthy = False
+                UPSTREAM_DURATION.observe((method, "error"), time.perf_counter() - started_at)
+                UPSTREAM_ERRORS.inc((method, "upstreamError"))
+                raise NewsAPIException(
+                    {"status": "error", "code": "upstreamError", "message": str(e)}
+                ) from e
+            healthy = response.status_code < 500
+        finally:
+            self.breaker.record(healthy)
+        ok = payload.get("status") == "ok"
+        UPSTREAM_DURATION.observe((method, "ok" if ok else "error"), time.perf_counter() - started_at)
+        if not ok:
+            UPSTREAM_ERRORS.inc((method, payload.get("code")))
+            if payload.get("code") == "rateLimited":
+                self.scheduler.back_off(_retry_after(response))
+            raise NewsAPIException(payload)
+        return payload
 
-    client: NewsApiClient
+    async def _cached_get(self, method: str, cache: ResponseCache, endpoint: str,
+                          **params) -> dict:
+        """``_get`` through ``cache``, serving stale entries while they are refreshed."""
+        params = _canonical_params(params)
+        key = _request_key(endpoint, params)
+        payload, state = cache.lookup(key)
+        if state == FRESH:
+            return payload
+        if state == STALE:
+            cache.revalidate(
+                key, lambda: self._get(method, endpoint, priority=Priority.BACKGROUND, **params)
+            )
+            return payload
+        payload = await self._get(method, endpoint, **params)
+        cache.set(key, payload)
+        return payload
+
+    async def _get_all_news_pages(self, search: str, page: int, limit: int) -> dict:
+        """Build one logical page larger than the upstream page size.
+
+        The first upstream page of the slice is fetched alone; its
+        ``totalResults`` and ``NEWS_API_MAX_RESULTS`` bound the pages still
+        needed, which are then fetched concurrently, at most
+        ``NEWS_API_PAGE_CONCURRENCY`` at a time, and merged back in order.
+        """
+        page_size = NEWS_API_MAX_PAGE_SIZE
+        start = (page - 1) * limit
+        end = start + limit
+        if NEWS_API_MAX_RESULTS > 0:
+            end = min(end, NEWS_API_MAX_RESULTS)
+        if end <= start:
+            return {"status": "ok", "totalResults": None, "articles": []}
+        first_page = start // page_size + 1
+        semaphore = asyncio.Semaphore(NEWS_API_PAGE_CONCURRENCY)
 
-    def __init__(self):
-        self.client = NewsApiClient(api_key=NEWS_API_KEY)
+        async def fetch_page(upstream_page: int) -> dict:
+            async with semaphore:
+                return await self._cached_get(
+                    "get_all_news", self.search_cache, "/everything",
+                    q=search, page=upstream_page, pageSize=page_size,
+                )
+
+        first = await fetch_page(first_page)
+        total_results = first.get("totalResults") or 0
+        last_page = min((end - 1) // page_size + 1, math.ceil(total_results / page_size))
+        payloads = [first, *await asyncio.gather(
+            *(fetch_page(upstream_page) for upstream_page in range(first_page + 1, last_page + 1))
+        )]
+        articles = [article for payload in payloads for article in payload.get("articles") or []]
+        offset = start - (first_page - 1) * page_size
+        return {
+            "status": "ok",
+            "totalResults": first.get("totalResults"),
+            "articles": articles[offset:offset + end - start],
+        }
 
     async def get_all_news(self, search: str, page: int, limit: int):
-        """Get all news articles based on search query with pagination."""
+        """Get all news articles based on search query with pagination.
+
+        Pages larger than the upstream maximum page size are assembled from
+        several upstream pages.
+        """
         try:
-            news = self.client.get_everything(q=search, page=page, page_size=limit)
+            if limit > NEWS_API_MAX_PAGE_SIZE:
+                return await self._get_all_news_pages(search=search, page=page, limit=limit)
+            news = await self._cached_get(
+                "get_all_news", self.search_cache, "/everything",
+                q=search, page=page, pageSize=limit,
+            )
             return news
         except NewsAPIException as e:
             Log.error(
@@ -24,11 +271,48 @@ class NewsAPI:
             )
             return None
 
+    async def iter_news_pages(self, search: str, max_pages: int = None):
+        """Yield the articles of every upstream result page of a search.
+
+        The next page is requested while the caller is still consuming the
+        current one, so at most two pages are held at a time. Closing the
+        generator early cancels the pending prefetch. Failures are raised as
+        ``NewsAPIException``.
+        """
+        def fetch_page(upstream_page: int) -> asyncio.Future:
+            return asyncio.ensure_future(self._get(
+                "iter_news_pages", "/everything", priority=Priority.BACKGROUND,
+                q=search, page=upstream_page, pageSize=NEWS_API_MAX_PAGE_SIZE,
+            ))
+
+        upstream_page, fetched = 1, 0
+        next_page = fetch_page(upstream_page)
+        try:
+            while next_page is not None:
+                payload = await next_page
+                articles = payload.get("articles") or []
+                fetched += len(articles)
+                has_more = (
+                    bool(articles)
+                    and fetched < (payload.get("totalResults") or 0)
+                    and (max_pages is None or upstream_page < max_pages)
+                )
+                upstream_page += 1
+                next_page = fetch_page(upstream_page) if has_more else None
+                if articles:
+                    yield articles
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+                if next_page.done() and not next_page.cancelled():
+                    next_page.exception()
+
     async def get_top_three_headlines(self):
         """Get the top three headlines in the US."""
         try:
-            top_three_headlines = self.client.get_top_headlines(
-                country="us", page_size=5, page=1
+            top_three_headlines = await self._get(
+                "get_top_three_headlines", "/top-headlines", priority=Priority.BACKGROUND,
+                country="us", pageSize=5, page=1,
             )
             articles = top_three_headlines.get("articles")
             return articles[:3] if articles else []
@@ -41,7 +325,10 @@ class NewsAPI:
     async def get_headlines_by_country(self, country_code: str):
         """Get news headlines by country code."""
         try:
-            headlines = self.client.get_top_headlines(country=country_code)
+            headlines = await self._cached_get(
+                "get_headlines_by_country", self.country_cache, "/top-headlines",
+                country=country_code,
+            )
             articles = headlines.get("articles")
             return articles
         except NewsAPIException as e:
@@ -56,7 +343,10 @@ class NewsAPI:
             source_id.lower().split()
         )  # Converting to News API source ID format
         try:
-            headlines = self.client.get_top_headlines(sources=source_id)
+            headlines = await self._cached_get(
+                "get_headlines_by_source", self.source_cache, "/top-headlines",
+                sources=source_id,
+            )
             articles = headlines.get("articles")
             return articles
         except NewsAPIException as e:
@@ -64,3 +354,41 @@ class NewsAPI:
                 message="Failed: Encountered NewsAPIException", data={"error": str(e)}
             )
             return None
+
+    def last_good_headlines(self, country_code: str = None, source_id: str = None):
+        """Most recently cached headlines for a country and/or source, however old.
+
+        Returns ``None`` when nothing has been cached yet. With both filters the
+        country headlines are narrowed down to the source.
+        """
+        if source_id:
+            source_id = "-".join(source_id.lower().split())  # News API source ID format
+        if country_code:
+            cache, params = self.country_cache, {"country": country_code}
+        else:
+            cache, params = self.source_cache, {"sources": source_id}
+        payload = cache.peek(_request_key("/top-headlines", _canonical_params(params)))
+        if payload is MISSING:
+            return None
+        articles = payload.get("articles") or []
+        if country_code and source_id:
+            articles = [
+                article for article in articles
+                if (article.get("source") or {}).get("id") == source_id
+            ]
+        return articles
+
+
+news_api_client = NewsAPI()
+
+registry.register_cache("news_country", news_api_client.country_cache.stats)
+registry.register_cache("news_source", news_api_client.source_cache.stats)
+registry.register_cache("news_search", news_api_client.search_cache.stats)
+registry.register_stats(
+    "news_upstream_scheduler", "NewsAPI call scheduler", news_api_client.scheduler.stats,
+    counters=("granted", "shed"),
+)
+registry.register_stats(
+    "news_upstream_single_flight", "Coalescing of identical NewsAPI calls",
+    news_api_client.single_flight.stats, counters=("calls", "coalesced"),
+)
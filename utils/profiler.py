@@ -0,0 +1,115 @@
+import cProfile
+import itertools
+import pstats
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from conf.vars import PROFILE_BUFFER_SIZE, PROFILE_TOP_FUNCTIONS
+
+
+__all__ = ['RequestProfile', 'ProfileStore', 'profile_store']
+
+
+class RequestProfile:
+    """cProfile run over one request, plus its wall clock and CPU time.
+
+    cProfile follows the thread, not the task: while the request awaits,
+    whatever else the event loop runs is profiled too. Wall time minus CPU
+    time is the time the request spent waiting (I/O, upstream calls, the
+    database) with the loop idle.
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status = None
+        self._profiler = cProfile.Profile()
+        self._started_at = None
+        self._wall = 0.0
+        self._cpu = 0.0
+
+    def __enter__(self):
+        self._started_at = datetime.now(timezone.utc)
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *_exc_info):
+        self._profiler.disable()
+        self._wall = time.perf_counter() - self._wall
+        self._cpu = time.thread_time() - self._cpu
+
+    def top_functions(self, limit: int) -> List[dict]:
+        """The ``limit`` functions with the highest cumulative time."""
+        stats = pstats.Stats(self._profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, total, cumulative, _) in rows
+        ]
+
+    def to_json(self, limit: int = PROFILE_TOP_FUNCTIONS) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self._started_at.isoformat() if self._started_at else None,
+            "wall_ms": round(self._wall * 1000, 3),
+            "cpu_ms": round(self._cpu * 1000, 3),
+            "wait_ms": round(max(self._wall - self._cpu, 0) * 1000, 3),
+            "top_functions": self.top_functions(limit),
+        }
+
+
+class ProfileStore:
+    """Ring buffer of the latest request profiles.
+
+    Only one request is profiled at a time (cProfile is per thread), so
+    ``start`` returns ``None`` while another profile is running.
+    """
+
+    def __init__(self, maxsize: int):
+        self._profiles = deque(maxlen=maxsize)
+        self._ids = itertools.count(1)
+        self.busy = False
+
+    def start(self, method: str, path: str) -> Optional[RequestProfile]:
+        """A new profile to run, or ``None`` if one is already running."""
+        if self.busy:
+            return None
+        self.busy = True
+        return RequestProfile(next(self._ids), method, path)
+
+    def finish(self, profile: RequestProfile) -> None:
+        """Store a finished profile, dropping the oldest one when full."""
+        try:
+            self._profiles.append(profile.to_json())
+        finally:
+            self.busy = False
+
+    def list(self) -> List[dict]:
+        """Stored profiles without their function tables, newest first."""
+        return [
+            {key: value for key, value in profile.items() if key != "top_functions"}
+            for profile in reversed(self._profiles)
+        ]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        return next((profile for profile in self._profiles if profile["id"] == profile_id), None)
+
+    def clear(self) -> None:
+        """Drop every profile."""
+        self._profiles.clear()
+
+
+profile_store = ProfileStore(maxsize=PROFILE_BUFFER_SIZE)
@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Callable, Dict
+
+from newsapi.newsapi_exception import NewsAPIException
+
+
+__all__ = ['Priority', 'QuotaExceeded', 'UpstreamScheduler']
+
+
+class Priority(IntEnum):
+    """Scheduling lanes for upstream calls; lower values are served first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class QuotaExceeded(NewsAPIException):
+    """Raised when an upstream call is shed instead of being sent."""
+
+    def __init__(self, message: str):
+        super().__init__({"status": "error", "code": "quotaExceeded", "message": message})
+
+
+class UpstreamScheduler:
+    """Token bucket with a daily budget and priority lanes.
+
+    ``rate`` tokens per second refill a bucket holding at most ``burst``
+    tokens, and each upstream call spends one token and one unit of the daily
+    budget (``rate=0`` and ``daily_budget=0`` mean no cap). Callers queue for
+    tokens in priority order, so interactive calls overtake background ones.
+    Background calls are shed once the remaining daily budget falls to
+    ``background_reserve`` (a fraction of the budget), and any call that
+    cannot be granted within its lane's ``max_wait`` is shed as well.
+
+    ``back_off`` pauses all calls for a while after the upstream throttled us.
+    Background calls are shed during the pause, interactive calls wait for
+    its end when that fits in their ``max_wait``.
+    """
+
+    def __init__(self, rate: float, burst: int, daily_budget: int = 0,
+                 background_reserve: float = 0.0, max_wait: Dict[Priority, float] = None,
+                 backoff: float = 60.0,
+                 timer: Callable[[], float] = time.monotonic,
+                 clock: Callable[[], float] = time.time):
+        self.rate = rate
+        self.burst = burst
+        self.daily_budget = daily_budget
+        self.background_reserve = int(daily_budget * background_reserve)
+        self.max_wait = max_wait or {Priority.INTERACTIVE: 5.0, Priority.BACKGROUND: 30.0}
+        self.backoff = backoff
+        self._timer = timer
+        self._clock = clock
+        self._tokens = float(burst) if rate > 0 else float("inf")
+        self._updated_at = timer()
+        self._day = self._today()
+        self._used_today = 0
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._wakeup = None
+        self.granted = 0
+        self.shed = 0
+
+    @property
+    def remaining_today(self):
+        """Calls left in today's budget, or ``None`` when there is no cap."""
+        self._roll_day()
+        if not self.daily_budget:
+            return None
+        return max(self.daily_budget - self._used_today, 0)
+
+    def _today(self) -> int:
+        return int(self._clock() // 86400)
+
+    def _roll_day(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+
+    def _pause_remaining(self) -> float:
+        return max(self._paused_until - self._timer(), 0.0)
+
+    def _refill(self) -> None:
+        if self.rate <= 0:
+            return
+        now = self._timer()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _budget_error(self, priority: Priority):
+        remaining = self.remaining_today
+        if remaining is None:
+            return None
+        if remaining <= 0:
+            return QuotaExceeded("Daily NewsAPI budget exhausted")
+        if priority == Priority.BACKGROUND and remaining <= self.background_reserve:
+            return QuotaExceeded("NewsAPI budget reserved for interactive requests")
+        return None
+
+    def _pause_error(self, priority: Priority):
+        paused_for = self._pause_remaining()
+        if paused_for and (priority == Priority.BACKGROUND or paused_for > self.max_wait[priority]):
+            return QuotaExceeded(f"NewsAPI rate limited, retrying in {paused_for:.0f}s")
+        return None
+
+    def _grant(self) -> None:
+        self._tokens -= 1
+        self._used_today += 1
+        self.granted += 1
+
+    def back_off(self, seconds: float = None) -> None:
+        """Pause calls for ``seconds`` (default ``backoff``), e.g. after a ``rateLimited`` reply."""
+        seconds = self.backoff if seconds is None else seconds
+        self._paused_until = max(self._paused_until, self._timer() + seconds)
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Wait for permission to make one upstream call, or raise ``QuotaExceeded``."""
+        error = self._budget_error(priority) or self._pause_error(priority)
+        if error is not None:
+            self.shed += 1
+            raise error
+        self._refill()
+        if not self._waiters and self._tokens >= 1 and not self._pause_remaining():
+            self._grant()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait[priority])
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self.shed += 1
+                raise QuotaExceeded("Timed out waiting for NewsAPI rate budget") from None
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _dispatch(self) -> None:
+        """Hand out available tokens to queued callers in priority order."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        self._refill()
+        paused_for = self._pause_remaining()
+        if paused_for and self._waiters:
+            self._wakeup = asyncio.get_running_loop().call_later(paused_for, self._dispatch)
+            return
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            error = self._budget_error(priority)
+            if error is not None:
+                heapq.heappop(self._waiters)
+                self.shed += 1
+                future.set_exception(error)
+                continue
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._grant()
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        """Counters describing scheduler state."""
+        return {
+            "granted": self.granted,
+            "shed": self.shed,
+            "queued": sum(1 for *_, future in self._waiters if not future.done()),
+            "remaining_today": self.remaining_today,
+            "paused_seconds": self._pause_remaining(),
+        }
@@ -1,7 +1,14 @@
+import hashlib
+import heapq
+import time
+from collections import OrderedDict
 from datetime import timedelta, datetime
+from typing import Callable, Optional
+
 import jwt
 
-from conf.vars import JWT_SECRET, CLIENT_ID
+from conf.vars import JWT_SECRET, CLIENT_ID, JWT_CACHE_MAXSIZE
+from utils.metrics import registry
 
 
 def generate_access_token():
@@ -12,3 +19,92 @@ def generate_access_token():
     }
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
     return encoded_jwt
+
+
+class VerifiedTokenCache:
+    """LRU cache of verified JWT claims, keyed by a SHA-256 digest of the token.
+
+    An entry lives until the ``exp`` of its token and is evicted then; tokens
+    without ``exp`` are never cached. ``maxsize`` bounds the number of
+    entries, evicting the least recently used one first.
+    """
+
+    def __init__(self, maxsize: int, timer: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self._timer = timer
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._expiry = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """The cached claims of ``token``, or ``None`` if it is unknown or expired."""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > self._timer():
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, token: str, claims: dict) -> None:
+        """Cache the claims of a verified token until its ``exp``."""
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        self._evict_expired()
+        key = self._key(token)
+        self._entries[key] = (claims, expires_at)
+        self._entries.move_to_end(key)
+        heapq.heappush(self._expiry, (expires_at, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _evict_expired(self) -> None:
+        now = self._timer()
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[key]
+        # Keys evicted as least recently used leave stale heap items behind
+        if len(self._expiry) > 2 * self.maxsize:
+            self._expiry = [(expires_at, key) for key, (_, expires_at) in self._entries.items()]
+            heapq.heapify(self._expiry)
+
+    def stats(self) -> dict:
+        """Hit / miss counters and the current size."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._expiry.clear()
+
+
+verified_tokens = VerifiedTokenCache(maxsize=JWT_CACHE_MAXSIZE)
+registry.register_cache(
+    "verified_tokens", lambda: {"hit": verified_tokens.hits, "miss": verified_tokens.misses}
+)
+
+
+def decode_access_token(token: str) -> dict:
+    """Claims of a valid access token, verifying it only on a cache miss.
+
+    Raises ``jwt.InvalidTokenError`` for an invalid or expired token.
+    """
+    claims = verified_tokens.get(token)
+    if claims is None:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        verified_tokens.set(token, claims)
+    return claims
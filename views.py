@@ -1,33 +1,190 @@
+import asyncio
+import json
+import time
 import urllib.parse
+from datetime import datetime
 
-from conf.paginations import Pagination
-from conf.response import CustomJSONResponse
-from utils.news_api_client import NewsAPI
+from fastapi.responses import StreamingResponse
+from newsapi.newsapi_exception import NewsAPIException
+
+from conf.paginations import Pagination, CursorPagination
+from conf.vars import (
+    NEWS_FALLBACK_ARTICLE_LIMIT,
+    NEWS_CACHE_COUNTRY_TTL,
+    NEWS_CACHE_SOURCE_TTL,
+    NEWS_CACHE_SEARCH_TTL,
+    NEWS_RENDER_CACHE_MAXSIZE,
+)
+from conf.response import CustomJSONResponse, RenderedResponseCache
+from utils.article_search import article_search
+from utils.article_store import ARTICLE_FIELDS, save_articles, filter_articles, get_article
+from utils.log import Log
+from utils.metrics import registry
+from utils.news_api_client import news_api_client
 from models import Article
 from schemas import AllowedCountryCodes
 
 
+# Rendered bodies of the upstream backed endpoints, reused while the cached payload is unchanged
+rendered_responses = RenderedResponseCache(maxsize=NEWS_RENDER_CACHE_MAXSIZE)
+registry.register_cache("rendered_responses", rendered_responses.stats)
+
+# Stored articles are the US top headlines, see save_latest_news_view
+FALLBACK_COUNTRY = "us"
+
+
+def _stored_article_to_headline(article: dict) -> dict:
+    """Shape a stored article row like a NewsAPI article."""
+    published_at = article.get("published_at")
+    return {
+        "source": {"id": None, "name": None},
+        "author": article.get("author"),
+        "title": article.get("title"),
+        "description": article.get("description"),
+        "url": None,
+        "urlToImage": None,
+        "publishedAt": published_at.isoformat() if published_at else None,
+        "content": None,
+    }
+
+
+async def _headlines_failure_response(country_code: str = None, source_id: str = None):
+    """Response for a failed headlines lookup.
+
+    While the NewsAPI circuit is open the last cached headlines are served
+    instead, falling back to the stored articles (US top headlines) for the
+    US country endpoint. Such responses keep the shape of a healthy one and
+    are flagged by the ``X-News-Degraded`` header and their message.
+    """
+    if news_api_client.breaker.is_open:
+        articles = news_api_client.last_good_headlines(
+            country_code=country_code, source_id=source_id
+        )
+        country = getattr(country_code, "value", country_code)
+        if articles is None and country == FALLBACK_COUNTRY and not source_id:
+            stored_articles = await Article.all().order_by("-published_at", "-id").limit(
+                NEWS_FALLBACK_ARTICLE_LIMIT
+            ).values("title", "author", "description", "published_at")
+            articles = [_stored_article_to_headline(article) for article in stored_articles]
+        if articles is not None:
+            return CustomJSONResponse(
+                content=articles,
+                message="NewsAPI is unavailable, served stored headlines",
+                headers={"X-News-Degraded": "true"},
+            )
+    return CustomJSONResponse(
+        content=None,
+        message="Failed to fetch the headlines",
+        status_code=400,
+    )
+
+
 async def get_news_view(search: str, page: int = 1, limit: int = 10):
     """View to get news headlines with pagination."""
     search = urllib.parse.quote(search)
-    news_api_client = NewsAPI()
     news = await news_api_client.get_all_news(search=search, page=page, limit=limit)
     if news is None:
         return CustomJSONResponse(
             content=None, message="Failed to fetch the news", status_code=400
         )
+
+    def render():
+        pagination = Pagination(
+            page=page,
+            limit=limit,
+            total_count=news.get("totalResults"),
+            data=news.get("articles"),
+        )
+        return CustomJSONResponse(content=pagination.get_paginated_data())
+
+    return rendered_responses.response(
+        ("news", search, page, limit), (news,), render, max_age=NEWS_CACHE_SEARCH_TTL
+    )
+
+
+async def _ndjson_articles(first_page: list, pages):
+    """Encode result pages as NDJSON lines, one article per line."""
+    try:
+        for article in first_page:
+            yield json.dumps(article) + "\n"
+        async for articles in pages:
+            yield "".join(json.dumps(article) + "\n" for article in articles)
+    except NewsAPIException as e:
+        Log.error(message="Failed: News export interrupted", data={"error": str(e)})
+        yield json.dumps({"error": "Failed to fetch the news"}) + "\n"
+    finally:
+        await pages.aclose()
+
+
+async def export_news_view(search: str, max_pages: int = None):
+    """View to stream every search result as NDJSON.
+
+    Upstream pages are fetched one ahead of what has been written. When the
+    client disconnects the response is cancelled, which closes the page
+    iterator and stops further upstream calls.
+    """
+    search = urllib.parse.quote(search)
+    pages = news_api_client.iter_news_pages(search=search, max_pages=max_pages)
+    try:
+        first_page = await anext(pages, [])
+    except NewsAPIException as e:
+        Log.error(message="Failed: Encountered NewsAPIException", data={"error": str(e)})
+        return CustomJSONResponse(
+            content=None, message="Failed to fetch the news", status_code=400
+        )
+    return StreamingResponse(
+        _ndjson_articles(first_page, pages), media_type="application/x-ndjson"
+    )
+
+
+async def search_saved_articles_view(search: str, page: int = 1, limit: int = 10):
+    """View to full-text search the stored articles, best matches first."""
+    total_count, articles = await article_search.search(query=search, page=page, limit=limit)
     pagination = Pagination(
         page=page,
         limit=limit,
-        total_count=news.get("totalResults"),
-        data=news.get("articles"),
+        total_count=total_count,
+        data=articles,
     )
     return CustomJSONResponse(content=pagination.get_paginated_data())
 
 
+async def list_saved_articles_view(
+    cursor: str = None,
+    limit: int = 10,
+    author: str = None,
+    published_from: datetime = None,
+    published_to: datetime = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+):
+    """View to list the stored articles, newest first, with cursor pagination."""
+    filters = dict(
+        author=author,
+        published_from=published_from,
+        published_to=published_to,
+        created_from=created_from,
+        created_to=created_to,
+    )
+    has_filters = any(value is not None for value in filters.values())
+    total_count = None if has_filters else await CursorPagination.estimate_total("article")
+    pagination = CursorPagination(limit=limit, cursor=cursor, total_count=total_count)
+    await pagination.paginate(filter_articles(**filters), *ARTICLE_FIELDS)
+    return CustomJSONResponse(content=pagination.get_paginated_data())
+
+
+async def get_saved_article_view(article_id: int):
+    """View to get one stored article by id."""
+    article = await get_article(article_id)
+    if article is None:
+        return CustomJSONResponse(
+            content=None, message="Article Not Found", status_code=404
+        )
+    return CustomJSONResponse(content=article)
+
+
 async def save_latest_news_view():
-    """View to save the top three latest news headlines."""
-    news_api_client = NewsAPI()
+    """View to save the top three latest news headlines, skipping ones already saved."""
     top_three_articles = await news_api_client.get_top_three_headlines()
     if top_three_articles is None:
         return CustomJSONResponse(
@@ -35,86 +192,125 @@ async def save_latest_news_view():
             message="Failed to fetch the top three headlines",
             status_code=400,
         )
-    saved_articles = []
-    for article in top_three_articles:
-        article_obj = await Article.create(
-            **{
-                "title": article.get("title"),
-                "author": article.get("author"),
-                "description": article.get("description"),
-                "published_at": article.get("publishedAt"),
-            }
-        )
-        saved_articles.append(article_obj.to_json())
+    inserted, existing = await save_articles(top_three_articles)
     return CustomJSONResponse(
-        content=saved_articles, message="Saved latest three headlines successfully"
+        content={
+            "inserted": inserted,
+            "existing": existing,
+        },
+        message="Saved latest three headlines successfully",
     )
 
 
 async def get_headlines_by_country_view(country_code: AllowedCountryCodes):
     """View to get news headlines by country code."""
-    news_api_client = NewsAPI()
     articles = await news_api_client.get_headlines_by_country(country_code=country_code)
     if articles is None:
-        return CustomJSONResponse(
-            content=None,
-            message="Failed to fetch the headlines",
-            status_code=400,
-        )
-    return CustomJSONResponse(
-        content=articles, message="Fetched headlines successfully"
+        return await _headlines_failure_response(country_code=country_code)
+    return rendered_responses.response(
+        ("country", country_code),
+        (articles,),
+        lambda: CustomJSONResponse(content=articles, message="Fetched headlines successfully"),
+        max_age=NEWS_CACHE_COUNTRY_TTL,
     )
 
 
 async def get_headlines_by_source_view(source_id: str):
     """View to get news headlines by source ID."""
-    news_api_client = NewsAPI()
     articles = await news_api_client.get_headlines_by_source(source_id=source_id)
     if articles is None:
-        return CustomJSONResponse(
-            content=None,
-            message="Failed to fetch the headlines",
-            status_code=400,
-        )
-    return CustomJSONResponse(
-        content=articles, message="Fetched headlines successfully"
+        return await _headlines_failure_response(source_id=source_id)
+    return rendered_responses.response(
+        ("source", source_id),
+        (articles,),
+        lambda: CustomJSONResponse(content=articles, message="Fetched headlines successfully"),
+        max_age=NEWS_CACHE_SOURCE_TTL,
     )
 
 
+async def _timed(awaitable):
+    """Await ``awaitable`` and return its result with the elapsed milliseconds."""
+    started_at = time.perf_counter()
+    result = await awaitable
+    return result, (time.perf_counter() - started_at) * 1000
+
+
+def _intersect_headlines(country_articles: list, source_articles: list, source_id: str) -> list:
+    """Country headlines that belong to the source.
+
+    A country article matches when its source id is ``source_id`` or when the
+    source endpoint returned the same URL; both are looked up in a hash index.
+    """
+    source_ids = {source_id}
+    source_urls = set()
+    for article in source_articles:
+        source_ids.add((article.get("source") or {}).get("id"))
+        source_urls.add(article.get("url"))
+    source_ids.discard(None)
+    source_urls.discard(None)
+    results = []
+    seen_urls = set()
+    for article in country_articles:
+        url = article.get("url")
+        if url is not None and url in seen_urls:
+            continue
+        if (article.get("source") or {}).get("id") in source_ids or url in source_urls:
+            results.append(article)
+            seen_urls.add(url)
+    return results
+
+
 async def get_headlines_by_filter_view(
     country_code: AllowedCountryCodes = None, source_id: str = None
 ):
-    """View to get news headlines by country, source or both."""
+    """View to get news headlines by country, source or both.
+
+    With both filters the country and source headlines are fetched
+    concurrently and intersected. Upstream time for each branch is reported
+    in the ``Server-Timing`` header.
+    """
     if not country_code and not source_id:
         return CustomJSONResponse(
             content=None,
             message="country Or source Required",
             status_code=400,
         )
-    news_api_client = NewsAPI()
-    final_results = []
+    timings = {}
+    sources = ()
     if country_code and source_id:
-        country_code_results = (
-            await news_api_client.get_headlines_by_country(country_code=country_code)
-            or []
+        (country_results, timings["country"]), (source_results, timings["source"]) = (
+            await asyncio.gather(
+                _timed(news_api_client.get_headlines_by_country(country_code=country_code)),
+                _timed(news_api_client.get_headlines_by_source(source_id=source_id)),
+            )
         )
-        for article in country_code_results:
-            if article.get("source", {}).get("id") == source_id:
-                final_results.append(article)
+        final_results = None
+        sources = (country_results, source_results)
+        if country_results is not None and source_results is not None:
+            final_results = _intersect_headlines(
+                country_results, source_results, "-".join(source_id.lower().split())
+            )
     elif country_code:
-        final_results = await news_api_client.get_headlines_by_country(
-            country_code=country_code
+        final_results, timings["country"] = await _timed(
+            news_api_client.get_headlines_by_country(country_code=country_code)
         )
-    elif source_id:
-        final_results = await news_api_client.get_headlines_by_source(
-            source_id=source_id
+    else:
+        final_results, timings["source"] = await _timed(
+            news_api_client.get_headlines_by_source(source_id=source_id)
         )
     if final_results is None:
-        return CustomJSONResponse(
-            content=None,
-            message="Failed to fetch the headlines",
-            status_code=400,
+        return await _headlines_failure_response(
+            country_code=country_code, source_id=source_id
         )
-    return CustomJSONResponse(
-        content=final_results, message="Fetched headlines successfully"
+    server_timing = ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
+    max_age = min(
+        NEWS_CACHE_COUNTRY_TTL if country_code else float("inf"),
+        NEWS_CACHE_SOURCE_TTL if source_id else float("inf"),
+    )
+    return rendered_responses.response(
+        ("filter", country_code, source_id),
+        sources or (final_results,),
+        lambda: CustomJSONResponse(content=final_results, message="Fetched headlines successfully"),
+        max_age=max_age,
+        headers={"Server-Timing": server_timing},
     )